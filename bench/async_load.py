@@ -0,0 +1,105 @@
+"""
+Event loop responsiveness while 50 concurrent /percepteur and /metier style calls
+hit the database, calling the helpers inline vs through commands.utils.async_db.
+
+A second connection holds the write lock for LOCK_HOLD seconds during each
+burst, like a slow write or an external sqlite client would. The loop lag is
+measured by a ticker coroutine standing in for the gateway heartbeat: with
+inline calls it stalls for the whole lock wait.
+
+    python -m bench.async_load
+"""
+import asyncio
+import os
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+import commands.utils.sql as sql
+import commands.utils.percepteur as pc
+from commands.utils import async_db
+
+CONCURRENT = 50
+TICK = 0.005
+LOCK_HOLD = 0.2
+
+
+async def ticker(lags: list, stop: asyncio.Event):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append((time.perf_counter() - start - TICK) * 1000)
+
+
+def mixed_call(i: int):
+    if i % 2:
+        pc.reserve_zone(f"Zone {i}", f"user{i}")
+    else:
+        pc.get_zones_like("zone 1")
+
+
+def hold_write_lock(path: str, ready: threading.Event):
+    connection_obj = sqlite3.connect(path)
+    connection_obj.execute("BEGIN IMMEDIATE;")
+    ready.set()
+    time.sleep(LOCK_HOLD)
+    connection_obj.rollback()
+    connection_obj.close()
+
+
+async def inline_interaction(i: int, start: float, latencies: list):
+    await asyncio.sleep(0)
+    mixed_call(i)
+    latencies.append((time.perf_counter() - start) * 1000)
+
+
+async def async_interaction(i: int, start: float, latencies: list):
+    if i % 2:
+        await async_db.run_write(pc.reserve_zone, f"Zone {i}", f"user{i}")
+    else:
+        await async_db.run_read(pc.get_zones_like, "zone 1")
+    latencies.append((time.perf_counter() - start) * 1000)
+
+
+async def burst(path: str, interaction):
+    lags, latencies = [], []
+    stop = asyncio.Event()
+    tick_task = asyncio.create_task(ticker(lags, stop))
+    ready = threading.Event()
+    locker = threading.Thread(target=hold_write_lock, args=(path, ready))
+    locker.start()
+    ready.wait()
+    await asyncio.sleep(TICK * 2)
+    start = time.perf_counter()
+    await asyncio.gather(*(interaction(i, start, latencies) for i in range(CONCURRENT)))
+    stop.set()
+    await tick_task
+    locker.join()
+    return lags, latencies
+
+
+def report(name: str, lags: list, latencies: list):
+    latencies.sort()
+    print(f"{name:<8} | interaction p50 {statistics.median(latencies):7.2f} ms "
+          f"p95 {latencies[int(len(latencies) * 0.95) - 1]:7.2f} ms | loop lag max {max(lags):7.2f} ms")
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        sql.configure_pool(path)
+        sql.run_init_sql()
+        pc.bulk_register_zone([(f"Zone {i}", 0, '', 'BENCH') for i in range(5_000)])
+        async_db.configure()
+
+        report('inline', *await burst(path, inline_interaction))
+        report('async', *await burst(path, async_interaction))
+
+        async_db.shutdown()
+        sql.get_pool().close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
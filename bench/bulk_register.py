@@ -0,0 +1,49 @@
+"""
+Throughput of registering ten metiers per artisan: ten register calls vs one
+bulk_register upsert transaction.
+
+    python -m bench.bulk_register
+"""
+import logging
+import os
+import tempfile
+import time
+
+import commands.utils.sql as sql
+import commands.utils.metier as mt
+from commands.utils import dofus_const
+
+ARTISANS = 500
+METIERS = dofus_const.METIERS[:10]
+
+
+def per_call(prefix: str) -> float:
+    start = time.perf_counter()
+    for i in range(ARTISANS):
+        for metier in METIERS:
+            mt.register(metier, f"{prefix}{i}", 200)
+    return time.perf_counter() - start
+
+
+def bulk(prefix: str) -> float:
+    entries = ", ".join(f"{metier}:200" for metier in METIERS)
+    start = time.perf_counter()
+    for i in range(ARTISANS):
+        mt.bulk_register(entries, f"{prefix}{i}")
+    return time.perf_counter() - start
+
+
+def main():
+    logging.disable(logging.INFO)
+    with tempfile.TemporaryDirectory() as tmp:
+        sql.configure_pool(os.path.join(tmp, 'bench.db'))
+        sql.run_init_sql()
+        rows = ARTISANS * len(METIERS)
+        for name, func in (("register x10", per_call), ("bulk_register", bulk)):
+            elapsed = func(name)
+            print(f"{name:<14} | {rows} metiers in {elapsed:.2f}s | {rows / elapsed:9.0f} metiers/s")
+        sql.get_pool().close()
+
+
+if __name__ == '__main__':
+    main()
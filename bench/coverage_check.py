@@ -0,0 +1,72 @@
+"""
+Check that the coverage matrix maintained incrementally by register, update,
+delete and bulk_register always equals a full recompute from METIERS, over a
+random sequence of writes. Exits non-zero on the first mismatch.
+
+    python -m bench.coverage_check
+"""
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+import commands.utils.sql as sql
+import commands.utils.metier as mt
+from commands.utils import dofus_const
+from commands.utils import guilds
+from commands.utils.coverage import CoverageMatrix
+
+ARTISANS = 200
+OPERATIONS = 5_000
+CHECK_EVERY = 250
+
+
+def recomputed() -> dict:
+    matrix = CoverageMatrix()
+    matrix.load()
+    return matrix.snapshot()
+
+
+def random_write(rng: random.Random):
+    user = f"artisan{rng.randrange(ARTISANS)}"
+    metier = rng.choice(dofus_const.METIERS)
+    operation = rng.random()
+    if operation < 0.4:
+        mt.register(metier, user, rng.randint(1, 200))
+    elif operation < 0.65:
+        mt.update(metier, user, rng.randint(1, 200))
+    elif operation < 0.85:
+        mt.delete(metier, user)
+    else:
+        mt.bulk_register(", ".join(f"{m}:{rng.randint(1, 200)}" for m in rng.sample(dofus_const.METIERS, 4)), user)
+
+
+def main() -> int:
+    logging.disable(logging.INFO)
+    rng = random.Random(19)
+    with tempfile.TemporaryDirectory() as tmp:
+        sql.configure_pool(os.path.join(tmp, 'coverage.db'))
+        sql.run_init_sql()
+        coverage = guilds.state().coverage
+        for i in range(1, OPERATIONS + 1):
+            random_write(rng)
+            if i % CHECK_EVERY == 0 and coverage.snapshot() != recomputed():
+                print(f"MISMATCH after {i} writes")
+                return 1
+
+        start = time.perf_counter()
+        for _ in range(1_000):
+            mt.coverage_overview()
+        overview = (time.perf_counter() - start) / 1_000 * 1e6
+        with sql.get_connection() as connection_obj:
+            rows = connection_obj.execute("SELECT COUNT(*) FROM METIERS;").fetchone()[0]
+        sql.get_pool().close()
+    print(f"ok: {OPERATIONS} writes, matrix equal to a full recompute every {CHECK_EVERY} | "
+          f"{rows} rows | overview {overview:.1f} us per call")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,332 @@
+"""
+Offline load test of the slash command handlers.
+
+The /metier, /percepteur and /admin handlers and their autocompletes are
+registered on a fake client and driven with stub interactions against
+seeded temporary databases, one per synthetic guild. Each scenario runs
+`--calls` times with `--concurrency` interactions in flight and reports
+its throughput and latency percentiles.
+
+    python -m bench.harness
+    python -m bench.harness --save baseline.json
+    python -m bench.harness --baseline baseline.json   # exits 1 on a p95 regression
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+import discord
+from discord import app_commands
+
+import commands.utils.sql as sql
+import commands.utils.percepteur as pc
+from commands.utils import async_db
+from commands.utils import config
+from commands.utils import dofus_const
+from commands.utils import metrics
+from commands.utils.zone_index import normalize
+from commands.admin import admin_wrapper
+from commands.metier import metier_wrapper
+from commands.percepteur import percepteur_wrapper
+
+ADMIN_ID = 1
+FORUM_ID = 2
+WORDS = ["Plaine", "Bois", "Lac", "Mont", "Champs", "Village", "Marais", "Foret", "Crique", "Temple"]
+PLACES = ["Amakna", "Bonta", "Brakmar", "Astrub", "Pandala", "Otomai", "Frigost", "Sufokia", "Cania", "Sidimote"]
+
+
+# Fake discord layer
+
+class FakeCommand:
+    def __init__(self, callback):
+        self.callback = callback
+        self.autocompletes = {}
+
+    def autocomplete(self, name: str):
+        def decorator(func):
+            self.autocompletes[name] = func
+            return func
+        return decorator
+
+
+class FakeTree:
+    def __init__(self):
+        self.commands = {}
+
+    def command(self, name: str, description: str = None):
+        def decorator(func):
+            self.commands[name] = FakeCommand(func)
+            return self.commands[name]
+        return decorator
+
+
+class FakeThread:
+    def __init__(self, name: str, parent_id: int):
+        self.name = name
+        self.parent_id = parent_id
+
+
+class FakeGuild:
+    def __init__(self, forum):
+        self.forum = forum
+
+    async def active_threads(self):
+        # Active threads of the whole guild, only some of them in the forum
+        return [FakeThread(name, FORUM_ID if i % 2 else FORUM_ID + 1) for i, name in enumerate(self.forum.names())]
+
+
+class FakeForumChannel(discord.ForumChannel):
+    """
+    Forum whose threads are a mix of seeded zones, in other case, and new
+    names, so every import both skips and inserts zones.
+    """
+
+    def __init__(self, zones: int, threads: int):
+        self.id = FORUM_ID
+        self.guild = FakeGuild(self)
+        self.zones = zones
+        self.thread_count = threads
+        self.rng = random.Random(FORUM_ID)
+
+    def names(self):
+        return [zone_name(self.rng.randrange(self.zones)).upper() if i % 3 else f"Forum {self.rng.getrandbits(48)}"
+                for i in range(self.thread_count)]
+
+    async def archived_threads(self, limit=None):
+        for name in self.names():
+            await asyncio.sleep(0)
+            yield FakeThread(name, FORUM_ID)
+
+
+class FakeClient:
+    def __init__(self, forum=None):
+        self.tree = FakeTree()
+        self.forum = forum
+
+    def get_channel(self, channel_id: int):
+        return self.forum if channel_id == FORUM_ID else None
+
+
+class FakeUser:
+    def __init__(self, user_id: int, name: str):
+        self.id = user_id
+        self.display_name = name
+        self.name = name
+
+
+class FakeResponse:
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, content=None, **kwargs):
+        self.sent.append((content, kwargs))
+
+    async def defer(self, **kwargs):
+        pass
+
+    async def edit_message(self, **kwargs):
+        self.sent.append((None, kwargs))
+
+
+class FakeInteraction:
+    def __init__(self, user: FakeUser, guild_id: int):
+        self.user = user
+        self.guild_id = guild_id
+        self.response = FakeResponse()
+
+    async def edit_original_response(self, **kwargs):
+        self.response.sent.append((None, kwargs))
+
+
+def choice(value: str) -> app_commands.Choice:
+    return app_commands.Choice(name=value, value=value)
+
+
+# Synthetic guilds
+
+def zone_name(i: int) -> str:
+    return f"{WORDS[i % len(WORDS)]} {PLACES[i // len(WORDS) % len(PLACES)]} {i}"
+
+
+def seed(artisans: int, zones: int, locks: int):
+    """
+    Fill the current guild's database: `artisans` artisans with 1 to 5 metiers,
+    `zones` zones and `locks` released reservations plus a few current ones.
+    """
+    rng = random.Random(sql.current_guild.get())
+    metier_rows = [(f"artisan{i}", metier, rng.randint(1, 200), "2024-01-01 00:00:00", "2024-01-01 00:00:00")
+                   for i in range(artisans) for metier in rng.sample(dofus_const.METIERS, rng.randint(1, 5))]
+    lock_rows = [(zone_name(rng.randrange(zones)), f"artisan{rng.randrange(artisans)}", "2024-01-01 00:00:00",
+                  "BENCH", "2024-01-01 01:00:00") for _ in range(locks)]
+    with sql.get_connection() as connection_obj:
+        connection_obj.executemany(
+            "INSERT INTO METIERS (Pseudo, Metier, Level, DateCreated, DateUpdated) VALUES (?, ?, ?, ?, ?);",
+            metier_rows)
+        connection_obj.executemany(
+            "INSERT INTO ZONES (ZONE, ZoneKey, IsLocked, Date, CreatedBy) VALUES (?, ?, 0, '', 'BENCH');",
+            ((zone_name(i), normalize(zone_name(i))) for i in range(zones)))
+        connection_obj.executemany(
+            "INSERT INTO Lock (ZONE, Pseudo, Date, CreatedBy, Released) VALUES (?, ?, ?, ?, ?);", lock_rows)
+        connection_obj.commit()
+    sql.analyze()
+    for i in range(0, zones, 10):
+        pc.try_reserve(zone_name(i), f"artisan{i % artisans}")
+
+
+def write_config(path: str, guild_ids: list):
+    with open(path, "w") as stream:
+        json.dump({"token": "bench", "guild": guild_ids[0], "guilds": guild_ids, "admin_user": [ADMIN_ID]}, stream)
+    config.config.path = path
+
+
+# Scenarios: name -> call(interaction, rng) returning the handler coroutine
+
+def scenarios(tree: FakeTree, args) -> dict:
+    metier_menu = tree.commands["metier"]
+    percepteur_menu = tree.commands["percepteur"]
+    admin_menu = tree.commands["admin"].callback
+
+    def level(rng):
+        return rng.randint(1, 200)
+
+    async def bulk_zone(interaction, rng):
+        await admin_menu(interaction, choice("bulk_zone"), channel_id=str(FORUM_ID))
+        # The command answers every failure, count them from the final message
+        content = interaction.response.sent[-1][1]["content"]
+        if not content.startswith("Import terminé"):
+            raise RuntimeError(content)
+
+    return {
+        "metier register": lambda interaction, rng: metier_menu.callback(
+            interaction, choice("register"), metier=rng.choice(dofus_const.METIERS), level=level(rng)),
+        "metier update": lambda interaction, rng: metier_menu.callback(
+            interaction, choice("update"), metier=rng.choice(dofus_const.METIERS), level=level(rng)),
+        "metier bulk_register": lambda interaction, rng: metier_menu.callback(
+            interaction, choice("bulk_register"),
+            metiers=", ".join(f"{m}:{level(rng)}" for m in rng.sample(dofus_const.METIERS, 5))),
+        "metier list_artisans": lambda interaction, rng: metier_menu.callback(
+            interaction, choice("list_artisans"), metier=rng.choice(dofus_const.METIERS), level=level(rng)),
+        "metier get_artisan": lambda interaction, rng: metier_menu.callback(
+            interaction, choice("get_artisan"), pseudo=f"artisan{rng.randrange(args.artisans)}"),
+        "autocomplete pseudo": lambda interaction, rng: metier_menu.autocompletes["pseudo"](
+            interaction, f"artisan{rng.randrange(args.artisans)}"[:rng.randint(1, 9)]),
+        "percepteur reserve": lambda interaction, rng: percepteur_menu.callback(
+            interaction, choice("reserve_percepteur"), zone=zone_name(rng.randrange(args.zones))),
+        "percepteur unreserve": lambda interaction, rng: percepteur_menu.callback(
+            interaction, choice("unreserve_percepteur"), zone=zone_name(rng.randrange(args.zones))),
+        "percepteur list_all_zones": lambda interaction, rng: percepteur_menu.callback(
+            interaction, choice("list_all_zones")),
+        "autocomplete zone": lambda interaction, rng: percepteur_menu.autocompletes["zone"](
+            interaction, zone_name(rng.randrange(args.zones))[:rng.randint(1, 12)]),
+        "admin cache_stats": lambda interaction, rng: admin_menu(interaction, choice("cache_stats")),
+        "admin stats": lambda interaction, rng: admin_menu(interaction, choice("stats")),
+        "admin bulk_zone": bulk_zone,
+    }
+
+
+async def run_scenario(name: str, call, guild_ids: list, args) -> dict:
+    timer = metrics.Timer(name)
+    rng = random.Random(name)
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(i: int):
+        guild_id = guild_ids[i % len(guild_ids)]
+        interaction = FakeInteraction(FakeUser(ADMIN_ID, f"artisan{rng.randrange(args.artisans)}"), guild_id)
+        async with semaphore:
+            # Same as GuildCommandTree.interaction_check, in this call's own task
+            sql.current_guild.set(guild_id)
+            start = time.perf_counter()
+            failed = True
+            try:
+                await call(interaction, rng)
+                failed = False
+            finally:
+                timer.record(time.perf_counter() - start, failed)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(asyncio.create_task(one(i)) for i in range(args.calls)))
+    elapsed = time.perf_counter() - start
+    return {**timer.summary(), "per_s": args.calls / elapsed}
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    regressions = []
+    for name, summary in results.items():
+        before = baseline.get(name)
+        if before and summary["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {before['p95_ms']:.2f} -> {summary['p95_ms']:.2f} ms")
+    return regressions
+
+
+async def run(args) -> dict:
+    guild_ids = list(range(1000, 1000 + args.guilds))
+    sql.set_primary_guild(guild_ids[0])
+    client = FakeClient(FakeForumChannel(args.zones, args.threads))
+    metier_wrapper(client)
+    percepteur_wrapper(client)
+    admin_wrapper(client)
+
+    start = time.perf_counter()
+    for guild_id in guild_ids:
+        with sql.use_guild(guild_id):
+            sql.run_init_sql()
+            seed(args.artisans, args.zones, args.locks)
+    print(f"seeded {args.guilds} guilds x ({args.artisans} artisans, {args.zones} zones, {args.locks} locks) "
+          f"in {time.perf_counter() - start:.1f}s")
+
+    async_db.configure()
+    results = {}
+    print(f"{'scenario':<26} | {'calls/s':>8} | {'p50 ms':>7} | {'p95 ms':>7} | {'p99 ms':>7} | errors")
+    for name, call in scenarios(client.tree, args).items():
+        if args.only and args.only not in name:
+            continue
+        summary = results[name] = await run_scenario(name, call, guild_ids, args)
+        print(f"{name:<26} | {summary['per_s']:8.0f} | {summary['p50_ms']:7.2f} | {summary['p95_ms']:7.2f} | "
+              f"{summary['p99_ms']:7.2f} | {summary['errors']}")
+    async_db.shutdown()
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--guilds", type=int, default=2)
+    parser.add_argument("--artisans", type=int, default=5_000)
+    parser.add_argument("--zones", type=int, default=20_000)
+    parser.add_argument("--locks", type=int, default=50_000)
+    parser.add_argument("--threads", type=int, default=60, help="active and archived threads of the fake forum")
+    parser.add_argument("--calls", type=int, default=2_000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--only", help="run the scenarios whose name contains this text")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare the p95 latencies with this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 increase over the baseline")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    with tempfile.TemporaryDirectory() as tmp:
+        sql.configure_pool(os.path.join(tmp, 'bench.db'))
+        write_config(os.path.join(tmp, 'config.yml'), list(range(1000, 1000 + args.guilds)))
+        results = asyncio.run(run(args))
+        for pool in sql.guild_pools().values():
+            pool.close()
+
+    if args.save:
+        with open(args.save, "w") as stream:
+            json.dump(results, stream, indent=2)
+    if args.baseline:
+        with open(args.baseline) as stream:
+            regressions = compare(results, json.load(stream), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""
+Reservation latency as the Lock history grows to 1M released rows, before and
+after compact_lock_history moved them to LockArchive.
+
+    python -m bench.lock_history
+"""
+import logging
+import os
+import tempfile
+import time
+
+import commands.utils.sql as sql
+import commands.utils.percepteur as pc
+
+ZONES = 1_000
+HISTORY_STEPS = [0, 100_000, 1_000_000]
+CYCLES = 2_000
+
+
+def add_history(count: int):
+    rows = ((f"Zone {i % ZONES}", f"member{i % 97}", "2024-01-01 00:00:00", "BENCH", "2024-01-01 01:00:00")
+            for i in range(count))
+    with sql.get_connection() as connection_obj:
+        connection_obj.executemany(
+            "INSERT INTO Lock (ZONE, Pseudo, Date, CreatedBy, Released) VALUES (?, ?, ?, ?, ?);", rows)
+        connection_obj.commit()
+    sql.analyze()
+
+
+def reserve_cycle_us() -> float:
+    start = time.perf_counter()
+    for i in range(CYCLES):
+        zone = f"Zone {i % ZONES}"
+        pc.try_reserve(zone, "bench")
+        pc.try_unreserve(zone, "bench")
+    return (time.perf_counter() - start) / CYCLES * 1e6
+
+
+def main():
+    logging.disable(logging.INFO)
+    with tempfile.TemporaryDirectory() as tmp:
+        sql.configure_pool(os.path.join(tmp, 'bench.db'))
+        sql.run_init_sql()
+        pc.bulk_register_zone([(f"Zone {i}", 0, '', 'BENCH') for i in range(ZONES)])
+
+        history = 0
+        for target in HISTORY_STEPS:
+            add_history(target - history)
+            history = target
+            hot = reserve_cycle_us()
+
+            start = time.perf_counter()
+            moved = 0
+            while batch := pc.compact_lock_history():
+                moved += batch
+            compaction = time.perf_counter() - start
+            compacted = reserve_cycle_us()
+            print(f"{history:>9} history rows | reserve+unreserve {hot:7.1f} us uncompacted, "
+                  f"{compacted:7.1f} us compacted | compacted {moved} rows in {compaction:.2f}s")
+
+            # Put the history back in the hot table for the next step
+            with sql.get_connection() as connection_obj:
+                connection_obj.execute("INSERT INTO Lock SELECT ID, ZONE, Pseudo, Date, CreatedBy, Released "
+                                       "FROM LockArchive;")
+                connection_obj.execute("DELETE FROM LockArchive;")
+                connection_obj.commit()
+        sql.get_pool().close()
+
+
+if __name__ == '__main__':
+    main()
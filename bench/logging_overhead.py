@@ -0,0 +1,77 @@
+"""
+list_artisans latency with logging off, with the former synchronous handler
+on the calling thread and with commands.utils.log (queue handler, lazy
+formatting), at INFO and with the per-row debug logs sampled or not.
+
+The render cache is cleared before every call so each call logs its rows.
+
+    python -m bench.logging_overhead
+"""
+import logging
+import os
+import statistics
+import tempfile
+import time
+
+import commands.utils.sql as sql
+import commands.utils.metier as mt
+from commands.utils import dofus_const
+from commands.utils import log
+
+CALLS = 5_000
+ARTISANS = 200
+METIER = dofus_const.METIERS[0]
+
+
+def latencies() -> list:
+    timings = []
+    for _ in range(CALLS):
+        mt.render_artisans.cache_clear()
+        start = time.perf_counter()
+        mt.list_artisans(METIER, 1)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def report(name: str, timings: list):
+    timings.sort()
+    print(f"{name:<30} | {statistics.fmean(timings) * 1e6:7.1f}us | {timings[len(timings) // 2] * 1e6:7.1f}us | "
+          f"{timings[int(len(timings) * 0.99)] * 1e6:7.1f}us")
+
+
+def main():
+    root = logging.getLogger()
+    with tempfile.TemporaryDirectory() as tmp:
+        logging.disable(logging.INFO)
+        sql.configure_pool(os.path.join(tmp, 'bench.db'))
+        sql.run_init_sql()
+        for i in range(ARTISANS):
+            mt.register(METIER, f"artisan{i}", 1 + i % 200)
+        logging.disable(logging.NOTSET)
+        log_path = os.path.join(tmp, 'bench.log')
+        print(f"{'logging':<30} | {'mean':>9} | {'p50':>9} | {'p99':>9}")
+
+        root.setLevel(logging.WARNING)
+        report("off", latencies())
+
+        sync = logging.FileHandler(log_path)
+        sync.setFormatter(logging.Formatter(log.LOG_FORMAT))
+        root.addHandler(sync)
+        root.setLevel(logging.INFO)
+        report("INFO, synchronous handler", latencies())
+        root.removeHandler(sync)
+        sync.close()
+
+        for name, cfg in [
+            ("INFO, queue handler", {}),
+            ("DEBUG rows sampled 1/100", {"log_levels": {mt.__name__: "DEBUG"}}),
+            ("DEBUG every row", {"log_levels": {mt.__name__: "DEBUG"}, "log_debug_sample": 1}),
+        ]:
+            log.setup(cfg, logging.FileHandler(log_path))
+            report(name, latencies())
+            log.stop()
+        sql.get_pool().close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Per-command latency of the historical connect-per-call pattern vs the pooled layer.
+
+    python -m bench.pool
+"""
+import os
+import sqlite3
+import tempfile
+import time
+
+import commands.utils.sql as sql
+
+RUNS = [1_000, 10_000]
+
+
+def legacy_call(path: str, zone: str):
+    connection_obj = sqlite3.connect(path)
+    cursor_obj = connection_obj.cursor()
+    cursor_obj.execute("PRAGMA foreign_keys = ON;")
+    try:
+        cursor_obj.execute("SELECT * FROM ZONES WHERE ZONE = ?;", (zone,))
+        return cursor_obj.fetchall()
+    finally:
+        connection_obj.close()
+
+
+def pooled_call(zone: str):
+    with sql.get_connection() as connection_obj:
+        cursor_obj = connection_obj.cursor()
+        cursor_obj.execute("SELECT * FROM ZONES WHERE ZONE = ?;", (zone,))
+        return cursor_obj.fetchall()
+
+
+def timed(func, count: int) -> float:
+    start = time.perf_counter()
+    for i in range(count):
+        func(f"Zone {i % 100}")
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        sql.configure_pool(path)
+        sql.run_init_sql()
+        with sql.get_connection() as connection_obj:
+            connection_obj.executemany("INSERT INTO ZONES (ZONE, IsLocked, Date, CreatedBy) VALUES (?, 0, '', 'BENCH');",
+                                       [(f"Zone {i}",) for i in range(100)])
+            connection_obj.commit()
+
+        for count in RUNS:
+            legacy = timed(lambda zone: legacy_call(path, zone), count)
+            pooled = timed(pooled_call, count)
+            print(f"{count:>6} ops | connect-per-call {legacy:8.1f} us/op | pooled {pooled:8.1f} us/op "
+                  f"| x{legacy / pooled:.1f}")
+        sql.get_pool().close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+list_artisans latency with a warm query cache vs uncached.
+
+    python -m bench.query_cache
+"""
+import logging
+import os
+import random
+import tempfile
+import time
+
+import commands.utils.sql as sql
+import commands.utils.metier as mt
+from commands.utils import dofus_const
+from commands.utils import guilds
+
+ARTISANS = 2_000
+CALLS = 5_000
+
+
+def seed():
+    rng = random.Random(42)
+    rows = [(f"Artisan{i}", metier, rng.randint(1, 200), '', '')
+            for i in range(ARTISANS) for metier in rng.sample(dofus_const.METIERS, 5)]
+    with sql.get_connection() as connection_obj:
+        connection_obj.executemany(
+            "INSERT INTO METIERS (Pseudo, Metier, Level, DateCreated, DateUpdated) VALUES (?, ?, ?, ?, ?);", rows)
+        connection_obj.commit()
+
+
+def timed(func, args: list, cold: bool) -> float:
+    start = time.perf_counter()
+    for arg in args:
+        if cold:
+            guilds.state().artisans_cache.clear()
+        func(*arg)
+    return (time.perf_counter() - start) / len(args) * 1e6
+
+
+def main():
+    logging.disable(logging.INFO)
+    with tempfile.TemporaryDirectory() as tmp:
+        sql.configure_pool(os.path.join(tmp, 'bench.db'))
+        sql.run_init_sql()
+        seed()
+        rng = random.Random(7)
+        artisan_calls = [(rng.choice(dofus_const.METIERS), rng.choice([0, 100, 150, 199])) for _ in range(CALLS)]
+
+        uncached = timed(mt.list_artisans, artisan_calls, cold=True)
+        timed(mt.list_artisans, artisan_calls, cold=False)
+        cached = timed(mt.list_artisans, artisan_calls, cold=False)
+        print(f"{'list_artisans':<22} | uncached {uncached:8.1f} us/call | cached {cached:8.1f} us/call")
+        sql.get_pool().close()
+
+
+if __name__ == '__main__':
+    main()
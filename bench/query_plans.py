@@ -0,0 +1,80 @@
+"""
+Check with EXPLAIN QUERY PLAN that every hot query of commands/utils/metier.py and
+commands/utils/percepteur.py is served by an index on a freshly migrated database.
+Exits non-zero if a plan scans a table without an index or sorts in a temp b-tree.
+
+    python -m bench.query_plans
+"""
+import os
+import sys
+import tempfile
+
+import commands.utils.sql as sql
+
+HOT_QUERIES = [
+    ("SELECT Pseudo, Metier, Level, DateCreated, DateUpdated FROM METIERS "
+     "WHERE Metier = ? AND Level > ? ORDER BY Level DESC, Pseudo LIMIT ?;", ("Mineur", 100, 21)),
+    ("SELECT Pseudo, Metier, Level, DateCreated, DateUpdated FROM METIERS "
+     "WHERE Metier = ? AND Level > ? AND Level <= ? AND (Level < ? OR Pseudo > ?) "
+     "ORDER BY Level DESC, Pseudo LIMIT ?;", ("Mineur", 100, 150, 150, "Tocard", 21)),
+    ("SELECT Pseudo, Metier, Level, DateCreated, DateUpdated FROM METIERS WHERE Pseudo = ? ORDER BY Level DESC;",
+     ("Tocard",)),
+    ("SELECT Pseudo, COUNT(*) FROM METIERS GROUP BY Pseudo;", ()),
+    ("UPDATE METIERS SET level = ?, DateUpdated = ? WHERE Pseudo = ? AND Metier = ?;", (1, "", "Tocard", "Mineur")),
+    ("DELETE FROM METIERS WHERE Pseudo = ? AND Metier = ?;", ("Tocard", "Mineur")),
+    ("SELECT * FROM ZONES WHERE ZONE = ?;", ("Plaine des Porkass",)),
+    ("SELECT 1 FROM ZONES WHERE ZONE = ?;", ("Plaine des Porkass",)),
+    ("INSERT INTO ZONES (ZONE, ZoneKey, IsLocked, Date, CreatedBy) SELECT ?, ?, ?, ?, ? "
+     "WHERE NOT EXISTS (SELECT 1 FROM ZONES WHERE ZoneKey = ?);",
+     ("Plaine des Porkass", "plaine des porkass", 0, "", "BOT", "plaine des porkass")),
+    ("INSERT OR IGNORE INTO ZONES (ZONE, ZoneKey, IsLocked, Date, CreatedBy) SELECT ?, ?, ?, ?, ? "
+     "WHERE NOT EXISTS (SELECT 1 FROM ZONES WHERE ZoneKey = ?);",
+     ("Plaine des Porkass", "plaine des porkass", 0, "", "BOT", "plaine des porkass")),
+    ("SELECT ZONE, IsLocked, Date, CreatedBy FROM ZONES WHERE ZONE > ? ORDER BY ZONE LIMIT ?;", ("", 21)),
+    ("UPDATE ZONES SET IsLocked = 1 WHERE ZONE = ?;", ("Plaine des Porkass",)),
+    ("UPDATE Lock SET Released = ? WHERE ZONE = ? AND Released IS NULL;", ("", "Plaine des Porkass")),
+    ("UPDATE Lock SET Released = ? WHERE ZONE = ? AND Pseudo = ? AND Released IS NULL;",
+     ("", "Plaine des Porkass", "Tocard")),
+    ("SELECT Lock.Pseudo FROM ZONES LEFT JOIN Lock ON Lock.ZONE = ZONES.ZONE AND Lock.Released IS NULL "
+     "WHERE ZONES.ZONE = ?;", ("Plaine des Porkass",)),
+    ("SELECT ZONES.IsLocked, Lock.Pseudo FROM ZONES "
+     "LEFT JOIN Lock ON Lock.ZONE = ZONES.ZONE AND Lock.Released IS NULL WHERE ZONES.ZONE = ?;",
+     ("Plaine des Porkass",)),
+    ("SELECT ID FROM Lock WHERE Released IS NOT NULL ORDER BY ID LIMIT ?;", (5000,)),
+    ("DELETE FROM Lock WHERE ID BETWEEN ? AND ? AND Released IS NOT NULL;", (1, 5000)),
+    ("SELECT * FROM Lock WHERE Pseudo = ?;", ("Tocard",)),
+    ("SELECT LastSeq FROM WriteBehindState WHERE ID = 1;", ()),
+    ("UPDATE WriteBehindState SET LastSeq = ? WHERE ID = 1;", (1,)),
+]
+
+
+def plan(connection_obj, query: str, params: tuple):
+    return [row[3] for row in connection_obj.execute(f"EXPLAIN QUERY PLAN {query}", params)]
+
+
+def uses_index(detail: str) -> bool:
+    if detail.startswith("USE TEMP B-TREE"):
+        return False
+    # The single row of a SELECT without FROM, as in INSERT ... SELECT ? WHERE NOT EXISTS
+    if detail == "SCAN CONSTANT ROW":
+        return True
+    return not detail.startswith("SCAN ") or " USING " in detail
+
+
+def main() -> int:
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        sql.configure_pool(os.path.join(tmp, 'plans.db'))
+        sql.run_init_sql()
+        with sql.get_connection() as connection_obj:
+            for query, params in HOT_QUERIES:
+                details = plan(connection_obj, query, params)
+                ok = all(uses_index(detail) for detail in details)
+                failures += not ok
+                print(f"{'ok  ' if ok else 'SCAN'} {query}\n     {' | '.join(details)}")
+        sql.get_pool().close()
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""
+Render time and memory allocated per response, building the embed every call
+vs served by commands.utils.render (static embeds and cached renders).
+
+    python -m bench.render
+"""
+import inspect
+import logging
+import os
+import tempfile
+import time
+import tracemalloc
+
+import commands.utils.sql as sql
+import commands.utils.bot_default as bf
+import commands.utils.metier as mt
+import commands.utils.percepteur as pc
+from commands.help import help_embed
+from commands.utils import dofus_const
+
+CALLS = 2_000
+
+
+def per_call(func, args) -> tuple:
+    """
+    (microseconds, peak bytes allocated) of one call of func(*args).
+    """
+    start = time.perf_counter()
+    for _ in range(CALLS):
+        func(*args)
+    elapsed = (time.perf_counter() - start) / CALLS * 1e6
+
+    tracemalloc.start()
+    func(*args)
+    baseline, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak - baseline
+
+
+def main():
+    logging.disable(logging.INFO)
+    with tempfile.TemporaryDirectory() as tmp:
+        sql.configure_pool(os.path.join(tmp, 'bench.db'))
+        sql.run_init_sql()
+        pc.bulk_register_zone([(f"Zone {i}", 0, '', 'BENCH') for i in range(100)])
+        for i in range(100):
+            mt.bulk_register(", ".join(f"{metier}:{100 + i}" for metier in dofus_const.METIERS[:5]), f"artisan{i}")
+
+        artisans, _ = mt.artisans_page(dofus_const.METIERS[0], 1)
+        zones, _ = pc.zones_page()
+        metiers = mt._select_metiers("artisan1")
+        responses = [
+            ("help", help_embed, ()),
+            ("error_generic", bf.error_generic, ()),
+            ("not_admin", bf.not_admin, ()),
+            ("render_artisans", mt.render_artisans, (dofus_const.METIERS[0], 1, artisans, 1)),
+            ("render_zones", pc.render_zones, (zones, 1)),
+            ("render_metiers", mt.render_metiers, ("artisan1", metiers)),
+            ("coverage_overview", mt.coverage_overview, ()),
+        ]
+        print(f"{'response':<18} | {'built':>9} | {'cached':>9} | {'built alloc':>11} | {'cached alloc':>12}")
+        for name, func, args in responses:
+            # coverage_overview only looks up the cached render, build its inner function instead
+            built = (inspect.unwrap(mt._render_overview), (mt.guilds.state().coverage, 0)) \
+                if func is mt.coverage_overview else (inspect.unwrap(func), args)
+            built_us, built_bytes = per_call(*built)
+            cached_us, cached_bytes = per_call(func, args)
+            print(f"{name:<18} | {built_us:7.1f}us | {cached_us:7.2f}us | {built_bytes / 1024:9.1f}KB | "
+                  f"{cached_bytes / 1024:10.2f}KB")
+        sql.get_pool().close()
+
+
+if __name__ == '__main__':
+    main()
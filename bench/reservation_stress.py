@@ -0,0 +1,85 @@
+"""
+Concurrency stress test of the zone reservation engine: many threads race to
+reserve then release the same zones for several rounds. Every round must have
+exactly one winner per zone and the Lock table must never hold more than one
+current row per zone. Exits non-zero on any violation.
+
+    python -m bench.reservation_stress
+"""
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+import commands.utils.sql as sql
+import commands.utils.percepteur as pc
+
+THREADS = 16
+ZONES = 50
+ROUNDS = 5
+
+
+def race(zones: list):
+    barrier = threading.Barrier(THREADS)
+    winners = Counter()
+    holders = {}
+    lock = threading.Lock()
+
+    def worker(n: int):
+        user = f"member{n}"
+        barrier.wait()
+        for zone in zones:
+            status, _ = pc.try_reserve(zone, user)
+            if status == pc.RESERVED:
+                with lock:
+                    winners[zone] += 1
+                    holders[zone] = user
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return winners, holders
+
+
+def lock_rows() -> int:
+    with sql.get_connection() as connection_obj:
+        return connection_obj.execute("SELECT COUNT(*) FROM Lock WHERE Released IS NULL;").fetchone()[0]
+
+
+def main() -> int:
+    logging.disable(logging.INFO)
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        sql.configure_pool(os.path.join(tmp, 'stress.db'), size=THREADS)
+        sql.run_init_sql()
+        zones = [f"Zone {i}" for i in range(ZONES)]
+        pc.bulk_register_zone([(zone, 0, '', 'BENCH') for zone in zones])
+
+        start = time.perf_counter()
+        for round_no in range(ROUNDS):
+            winners, holders = race(zones)
+            bad = [zone for zone in zones if winners[zone] != 1]
+            rows = lock_rows()
+            failures += len(bad) + (rows != ZONES)
+            print(f"round {round_no}: {len(zones) - len(bad)}/{ZONES} zones with one winner, {rows} Lock rows")
+
+            for zone, user in holders.items():
+                status, _ = pc.try_unreserve(zone, user)
+                failures += status != pc.FREED
+            rows = lock_rows()
+            failures += rows != 0
+            while pc.compact_lock_history():
+                pass
+        elapsed = time.perf_counter() - start
+        print(f"{THREADS * ZONES * ROUNDS} reservation attempts in {elapsed:.2f}s, {failures} violations")
+        sql.get_pool().close()
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""
+Guild state load time at boot: rebuilt from the database vs restored from the
+snapshot written at shutdown, then the fallback when the snapshot is stale.
+The first pseudo and zone autocompletes are included, they are what a user
+waits on right after a restart.
+
+    python -m bench.warm_start
+"""
+import logging
+import os
+import tempfile
+import time
+
+import commands.utils.sql as sql
+import commands.utils.metier as mt
+from commands.utils import guilds
+from commands.utils import snapshot
+from bench.harness import seed
+
+ARTISANS = 5_000
+ZONES = 20_000
+LOCKS = 50_000
+
+
+def boot() -> float:
+    guilds._states.clear()
+    start = time.perf_counter()
+    state = guilds.state()
+    state.artisans.search("arti")
+    state.zones.search("zone")
+    return time.perf_counter() - start
+
+
+def main():
+    logging.disable(logging.INFO)
+    with tempfile.TemporaryDirectory() as tmp:
+        sql.configure_pool(os.path.join(tmp, 'bench.db'))
+        sql.run_init_sql()
+        seed(ARTISANS, ZONES, LOCKS)
+        # A few cached metier queries, as after some traffic
+        for metier in mt.dofus_const.METIERS:
+            mt.artisans_page(metier, 100)
+
+        cold = boot()
+        for metier in mt.dofus_const.METIERS:
+            mt.artisans_page(metier, 100)
+        snapshot.path = os.path.join(tmp, 'bench.snapshot')
+        start = time.perf_counter()
+        snapshot.save(guilds.state())
+        saved = time.perf_counter() - start
+        size = os.path.getsize(snapshot.path)
+
+        warm = boot()
+        cached = len(guilds.state().artisans_cache.dump())
+        mt.register(mt.dofus_const.METIERS[0], "latecomer", 100)
+        stale = boot()
+
+        print(f"{ARTISANS} artisans, {ZONES} zones | snapshot {size / 1024:.0f} KB written in {saved * 1000:.1f} ms")
+        print(f"{'rebuilt from the database':<28} | {cold * 1000:8.1f} ms")
+        print(f"{'restored from the snapshot':<28} | {warm * 1000:8.1f} ms | {cached} cached queries kept")
+        print(f"{'stale snapshot, rebuilt':<28} | {stale * 1000:8.1f} ms")
+        sql.get_pool().close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Zone name lookup latency over 10k zones: exact SQL match on ZONE (the former
+lookup, which misses any other case or accents), indexed ZoneKey match,
+in-memory resolve, and typo suggestions from the trigram-filtered edit
+distance vs a full scan.
+
+    python -m bench.zone_names
+"""
+import logging
+import os
+import random
+import tempfile
+import time
+
+import commands.utils.sql as sql
+import commands.utils.percepteur as pc
+from commands.utils.zone_index import zones as zone_index, normalize, edit_distance, max_edits
+from bench.zone_search import zone_names
+
+ZONES = 10_000
+QUERIES = 1_000
+
+
+def typed(names: list, count: int):
+    """(exact, lowercased without accents, one typo) variants of random names."""
+    rng = random.Random(7)
+    exact, folded, typos = [], [], []
+    for name in rng.sample(names, count):
+        exact.append(name)
+        folded.append(normalize(name))
+        position = rng.randrange(len(name))
+        typos.append(name[:position] + rng.choice("aeiourst") + name[position + 1:])
+    return exact, folded, typos
+
+
+def timed(func, queries: list) -> tuple:
+    found = 0
+    start = time.perf_counter()
+    for query in queries:
+        found += bool(func(query))
+    return (time.perf_counter() - start) / len(queries) * 1e6, found / len(queries)
+
+
+def scan_suggest(query: str):
+    key = normalize(query)
+    edits = max_edits(key)
+    return sorted((edit_distance(key, candidate, edits), candidate) for candidate in zone_index._names
+                  if edit_distance(key, candidate, edits) <= edits)[:3]
+
+
+def main():
+    logging.disable(logging.INFO)
+    with tempfile.TemporaryDirectory() as tmp:
+        sql.configure_pool(os.path.join(tmp, 'bench.db'))
+        sql.run_init_sql()
+        names = zone_names(ZONES)
+        pc.bulk_register_zone([(name, 0, '', 'BENCH') for name in names])
+        zone_index.load()
+        exact, folded, typos = typed(names, QUERIES)
+
+        def by_zone(query):
+            with sql.get_connection() as connection_obj:
+                return connection_obj.execute("SELECT ZONE FROM ZONES WHERE ZONE = ?;", (query,)).fetchone()
+
+        def by_key(query):
+            with sql.get_connection() as connection_obj:
+                return connection_obj.execute("SELECT ZONE FROM ZONES WHERE ZoneKey = ?;",
+                                              (normalize(query),)).fetchone()
+
+        print(f"{ZONES} zones, {QUERIES} queries")
+        print(f"{'lookup':<30} | {'latency':>11} | {'found':>6}")
+        for name, func, queries in [
+            ("SQL ZONE =, exact", by_zone, exact),
+            ("SQL ZONE =, folded", by_zone, folded),
+            ("SQL ZoneKey =, folded", by_key, folded),
+            ("index resolve, folded", zone_index.resolve, folded),
+            ("index resolve, typo", zone_index.resolve, typos),
+            ("suggest, typo", zone_index.suggest, typos),
+            ("full scan suggest, typo", scan_suggest, typos[:QUERIES // 50]),
+        ]:
+            latency, found = timed(func, queries)
+            print(f"{name:<30} | {latency:8.1f} us | {found:6.0%}")
+        sql.get_pool().close()
+
+
+if __name__ == '__main__':
+    main()
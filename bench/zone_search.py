@@ -0,0 +1,59 @@
+"""
+Zone autocomplete latency: SQL LIKE scan (get_zones_like) vs the in-memory zone index.
+
+    python -m bench.zone_search
+"""
+import os
+import random
+import tempfile
+import time
+
+import commands.utils.sql as sql
+import commands.utils.percepteur as pc
+from commands.utils.zone_index import zones as zone_index
+
+ZONES = 20_000
+QUERIES = 2_000
+WORDS = ["Plaine", "Forêt", "Lac", "Bord", "Champs", "Île", "Crocs", "Cimetière", "Marécage", "Rivière"]
+PLACES = ["Porkass", "Astrub", "Bonta", "Brâkmar", "Frigost", "Pandala", "Sufokia", "Amakna", "Cania", "Otomaï"]
+
+
+def zone_names(count: int):
+    rng = random.Random(42)
+    return [f"{rng.choice(WORDS)} des {rng.choice(PLACES)} {i}" for i in range(count)]
+
+
+def keystrokes(names: list, count: int):
+    rng = random.Random(7)
+    queries = []
+    for _ in range(count):
+        name = rng.choice(names)
+        start = rng.randrange(0, len(name) // 2)
+        queries.append(name[start:start + rng.randint(1, 8)].lower())
+    return queries
+
+
+def timed(func, queries: list) -> float:
+    start = time.perf_counter()
+    for query in queries:
+        func(query)
+    return (time.perf_counter() - start) / len(queries) * 1e6
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        sql.configure_pool(os.path.join(tmp, 'bench.db'))
+        sql.run_init_sql()
+        names = zone_names(ZONES)
+        pc.bulk_register_zone([(name, 0, '', 'BENCH') for name in names])
+        zone_index.load()
+        queries = keystrokes(names, QUERIES)
+
+        like = timed(pc.get_zones_like, queries)
+        indexed = timed(pc.search_zones, queries)
+        print(f"{ZONES} zones, {QUERIES} keystrokes | SQL LIKE {like:9.1f} us/query | index {indexed:9.1f} us/query")
+        sql.get_pool().close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,28 @@
+import logging
+import time
+
 import discord
 from discord import app_commands
 
-from commands.utils.admin import is_user_in_list
+from commands.utils.admin import is_user_in_list, cache_stats, metrics_stats
 import commands.utils.percepteur as pc
+from commands.utils import metrics
+from commands.utils import async_db
+import commands.utils.bot_default as bf
+import commands.utils.color as color
+
+logger = logging.getLogger(__name__)
+
+# Seconds between two progress edits of the bulk import message
+PROGRESS_INTERVAL = 2
 
 def admin_wrapper(client):
     @client.tree.command(name="admin", description="Manage admin actions")
     @app_commands.describe(
         actions="Choose an action to perform (e.g., Register, Delete, Update, etc.)",
         pseudo="Enter the name of the artisan (used with Get Artisan).",
+        zone="Zone the alias stands for (used with Zone Alias).",
+        alias="Other name of the zone (used with Zone Alias).",
     )
     @app_commands.choices(
         actions=[
@@ -18,16 +32,58 @@ def admin_wrapper(client):
             app_commands.Choice(name="Delete Zone", value="delete_zone"),
             app_commands.Choice(name="Add Zone", value="delete_zone"),
             app_commands.Choice(name="Bulk Forum Zone", value="bulk_zone"),
+            app_commands.Choice(name="Zone Alias", value="zone_alias"),
+            app_commands.Choice(name="Cache Stats", value="cache_stats"),
+            app_commands.Choice(name="Latency Stats", value="stats"),
         ],
     )
-    async def admin_menu(interaction: discord.Interaction, actions: app_commands.Choice[str], pseudo: str = None,  channel_id: str = None):
+    @metrics.timed("command.admin")
+    async def admin_menu(interaction: discord.Interaction, actions: app_commands.Choice[str], pseudo: str = None,  channel_id: str = None,
+                         zone: str = None, alias: str = None):
         user = interaction.user
         if not is_user_in_list(user):
-            await interaction.response.send_message('Not admin')
+            with metrics.measure("discord.send_message"):
+                await interaction.response.send_message(embed=bf.not_admin())
+            return
 
         if actions.value == 'bulk_zone':
-            channel = client.get_channel(int(channel_id))
-            rows = pc.bulk_zone_from_forum(channel)
-            await interaction.response.send_message(rows)
+            channel = client.get_channel(int(channel_id)) if channel_id and channel_id.isdigit() else None
+            if not isinstance(channel, discord.ForumChannel):
+                with metrics.measure("discord.send_message"):
+                    await interaction.response.send_message(embed=discord.Embed(
+                        title=f"Forum introuvable", description=channel_id, color=color.YELLOW))
+                return
+            await interaction.response.defer(thinking=True)
+
+            last_edit = 0.0
+
+            async def progress(seen, inserted):
+                nonlocal last_edit
+                if time.monotonic() - last_edit < PROGRESS_INTERVAL:
+                    return
+                last_edit = time.monotonic()
+                with metrics.measure("discord.edit_original_response"):
+                    await interaction.edit_original_response(content=f"Import en cours: {seen} threads lus, {inserted} zones ajoutées")
+
+            try:
+                seen, inserted = await pc.bulk_zone_from_forum(channel, progress)
+                content = f"Import terminé: {seen} threads lus, {inserted} zones ajoutées"
+            except Exception as e:
+                # The interaction is deferred, it must end with an edit whatever failed
+                logger.exception("Bulk import of forum %s failed: %s", channel.id, e)
+                content = "Import interrompu, les zones déjà ajoutées sont conservées"
+            with metrics.measure("discord.edit_original_response"):
+                await interaction.edit_original_response(content=content)
+        elif actions.value == 'zone_alias':
+            embed = await async_db.run_write(pc.add_zone_alias, alias, zone, user.display_name)
+            with metrics.measure("discord.send_message"):
+                await interaction.response.send_message(embed=embed)
+        elif actions.value == 'cache_stats':
+            with metrics.measure("discord.send_message"):
+                await interaction.response.send_message(embed=cache_stats())
+        elif actions.value == 'stats':
+            with metrics.measure("discord.send_message"):
+                await interaction.response.send_message(embed=metrics_stats())
         else:
-            await interaction.response.send_message("Bad Action")
+            with metrics.measure("discord.send_message"):
+                await interaction.response.send_message("Bad Action")
@@ -2,6 +2,9 @@ import discord
 from discord import app_commands
 
 import commands.utils.metier as mt
+from commands.utils import async_db
+from commands.utils.paginator import send_paginated
+from commands.utils import metrics
 from commands.utils import dofus_const
 
 
@@ -12,40 +15,60 @@ def metier_wrapper(client):
         metier="Specify the work you want to manage.",
         level="Enter the level for the métier (required for Register and Update).",
         pseudo="Enter the name of the artisan (used with Get Artisan).",
+        metiers="List of metier:level for Bulk Register (e.g. Forgemage:200, Mineur:180).",
     )
     @app_commands.choices(
         metier_action=[
             app_commands.Choice(name="Register", value="register"),
             app_commands.Choice(name="Delete", value="delete"),
             app_commands.Choice(name="Update", value="update"),
+            app_commands.Choice(name="Bulk Register", value="bulk_register"),
             app_commands.Choice(name="list_artisans", value="list_artisans"),
             app_commands.Choice(name="get_artisan", value="get_artisan"),
+            app_commands.Choice(name="Overview", value="overview"),
         ],
         metier=[app_commands.Choice(name=_conts_metier, value=_conts_metier) for _conts_metier in dofus_const.METIERS],
-        pseudo=[app_commands.Choice(name=_pseudo, value=_pseudo) for _pseudo in mt.get_artisan_list()]
     )
+    @metrics.timed("command.metier")
     async def metier_menu(interaction: discord.Interaction, metier_action: app_commands.Choice[str], metier: str = None,
-                          level: int = None, pseudo: str = None):
+                          level: int = None, pseudo: str = None, metiers: str = None):
         user = interaction.user.display_name
         func_map = {
             "register": mt.register,
             "delete": mt.delete,
             "update": mt.update,
+            "bulk_register": mt.bulk_register,
             "list_artisans": mt.list_artisans,
             "get_artisan": mt.list_metiers_by_user,
+            "overview": mt.coverage_overview,
         }
 
         embed = None
         if metier_action.value in ['register', 'update']:
-            embed = func_map[metier_action.value](metier, user, level)
+            embed = await async_db.run_write(func_map[metier_action.value], metier, user, level)
+        elif metier_action.value == 'bulk_register':
+            embed = await async_db.run_write(func_map[metier_action.value], metiers, user)
         elif metier_action.value == 'delete':
-            embed = func_map[metier_action.value](metier, user)
+            embed = await async_db.run_write(func_map[metier_action.value], metier, user)
         elif metier_action.value == 'list_artisans':
-            embed = func_map[metier_action.value](metier, level)
+            await send_paginated(interaction,
+                                 lambda after: mt.artisans_page(metier, level, after),
+                                 lambda rows, page: mt.render_artisans(metier, level, rows, page))
+            return
         elif metier_action.value == 'get_artisan':
-            embed = func_map[metier_action.value](pseudo)
+            embed = await async_db.run_read(func_map[metier_action.value], pseudo)
+        elif metier_action.value == 'overview':
+            embed = func_map[metier_action.value]()
 
         if embed is not None:
-            await interaction.response.send_message(embed=embed)
+            with metrics.measure("discord.send_message"):
+                await interaction.response.send_message(embed=embed)
         else:
-            await interaction.response.send_message("Invalid action.")
+            with metrics.measure("discord.send_message"):
+                await interaction.response.send_message("Invalid action.")
+
+    @metier_menu.autocomplete("pseudo")
+    @metrics.timed("autocomplete.pseudo")
+    async def pseudo_autocomplete(interaction: discord.Interaction, current: str):
+        pseudos = await async_db.run_read(mt.search_artisans, current)
+        return [app_commands.Choice(name=pseudo, value=pseudo) for pseudo in pseudos]
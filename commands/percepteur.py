@@ -5,6 +5,12 @@ from discord import app_commands
 
 
 import commands.utils.percepteur as pc
+from commands.utils import async_db
+from commands.utils.paginator import send_paginated
+from commands.utils import metrics
+
+logger = logging.getLogger(__name__)
+
 
 def percepteur_wrapper(client):
     @client.tree.command(name="percepteur", description="Manage percepteur actions")
@@ -17,8 +23,11 @@ def percepteur_wrapper(client):
             app_commands.Choice(name="Pose", value="add_percepteur"),
             app_commands.Choice(name="remove", value="collect_percepteur"),
             app_commands.Choice(name="Unreserved", value="unreserve_percepteur"),
+            app_commands.Choice(name="List zones", value="list_all_zones"),
+            app_commands.Choice(name="Board", value="board"),
         ],
     )
+    @metrics.timed("command.percepteur")
     async def percepteur_menu(interaction: discord.Interaction, actions: app_commands.Choice[str], zone: str = None):
         user = interaction.user.display_name
         func_map = {
@@ -27,18 +36,28 @@ def percepteur_wrapper(client):
             "free": pc.free_zone,
             "list_zone": pc.list_zone,
             "list_all_zones": pc.list_all_zone,
+            "board": pc.board,
         }
 
+        if actions.value == 'list_all_zones':
+            await send_paginated(interaction, pc.zones_page, pc.render_zones)
+            return
+
         embed = None
-        if actions.value == 'reserve_percepteur':
-            embed = func_map[actions.value](zone, user)
+        if actions.value in ['reserve_percepteur', 'unreserve_percepteur']:
+            embed = await async_db.run_write(func_map[actions.value], zone, user)
+        elif actions.value == 'board':
+            embed = func_map[actions.value]()
         if embed is not None:
-            await interaction.response.send_message(embed=embed)
+            with metrics.measure("discord.send_message"):
+                await interaction.response.send_message(embed=embed)
         else:
-            await interaction.response.send_message("Invalid action.")
+            with metrics.measure("discord.send_message"):
+                await interaction.response.send_message("Invalid action.")
 
     @percepteur_menu.autocomplete("zone")
+    @metrics.timed("autocomplete.zone")
     async def zone_autocomplete(interaction: discord.Interaction, current: str):
-        all_zones = pc.get_zones_like(current)
-        logging.info(f"Input: {current} Filtered zones: {all_zones}")
+        all_zones = pc.search_zones(current)
+        logger.debug("Input: %s Filtered zones: %s", current, all_zones)
         return [app_commands.Choice(name=zone, value=zone) for zone in all_zones]
@@ -1,8 +1,10 @@
 import discord
 from discord import app_commands
 from commands.utils.config import load_config
-
-cfg = load_config()
+import commands.utils.color as color
+from commands.utils import metrics
+from commands.utils import guilds
+from commands.utils import render
 
 
 def is_user_in_list(user: discord.User) -> bool:
@@ -12,4 +14,42 @@ def is_user_in_list(user: discord.User) -> bool:
     :param user: The discord.User object to check.
     :return: True if the user's ID is in the list, False otherwise.
     """
-    return user.id in cfg['admin_user']
\ No newline at end of file
+    return user.id in load_config()['admin_user']
+
+
+def _format_stats(stats: dict) -> str:
+    return "\n".join(f"{name}: {value:.2f}" if isinstance(value, float) else f"{name}: {value}"
+                     for name, value in stats.items())
+
+
+def cache_stats():
+    """
+    Build an embed with the hit/miss counters of the current guild's artisan page cache
+    and of the rendered embeds.
+    """
+    embed = discord.Embed(title="Cache stats", color=color.PURPLE)
+    state = guilds.state()
+    embed.add_field(name=state.artisans_cache.name, value=_format_stats(state.artisans_cache.stats()), inline=False)
+    embed.add_field(name="artisan autocomplete", value=_format_stats(state.artisans.stats()), inline=False)
+    for name, stats in render.stats().items():
+        embed.add_field(name=name, value=_format_stats(stats), inline=False)
+    return embed
+
+
+def metrics_stats():
+    """
+    Build an embed with the busiest instrumented calls. The Prometheus dump
+    of `metrics_file` is left to metrics.dump_forever, off the event loop.
+    """
+    embed = discord.Embed(title="Latency stats", color=color.PURPLE)
+    busiest = sorted(metrics.snapshot().items(), key=lambda item: item[1]["count"], reverse=True)
+    for name, summary in busiest[:25]:
+        embed.add_field(
+            name=name,
+            value=f"n={summary['count']} err={summary['errors']} | p50 {summary['p50_ms']:.1f} ms "
+                  f"p95 {summary['p95_ms']:.1f} ms p99 {summary['p99_ms']:.1f} ms",
+            inline=False
+        )
+    if not busiest:
+        embed.description = "Aucune mesure pour le moment"
+    return embed
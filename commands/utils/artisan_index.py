@@ -0,0 +1,140 @@
+import threading
+import time
+from collections import OrderedDict
+
+import commands.utils.sql as sql
+from commands.utils.zone_index import ZoneIndex, normalize, MAX_CHOICES
+
+REFRESH_TTL = 600
+RESULT_TTL = 60
+RESULT_CACHE_SIZE = 256
+
+
+class ArtisanIndex:
+    """
+    Pseudos having at least one registered metier, for the /metier pseudo autocomplete.
+
+    The set is kept current by the metier helpers and reloaded from the DB
+    every REFRESH_TTL seconds to catch writes made outside the bot. Answers
+    are memoized per typed prefix in a small LRU bounded by RESULT_CACHE_SIZE
+    entries and RESULT_TTL seconds.
+
+    The name index folds case and accents, so pseudos differing only by
+    those share one entry: every raw pseudo is kept under its folded key
+    and the entry goes away with the last of them.
+    """
+
+    def __init__(self, refresh_ttl: float = REFRESH_TTL, result_ttl: float = RESULT_TTL,
+                 cache_size: int = RESULT_CACHE_SIZE):
+        self.refresh_ttl = refresh_ttl
+        self.result_ttl = result_ttl
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._counts = {}
+        self._pseudos = {}
+        self._names = ZoneIndex('artisans')
+        self._results = OrderedDict()
+        self._loaded_at = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.refreshes = 0
+
+    def load(self):
+        with sql.get_connection() as connection_obj:
+            rows = connection_obj.execute("SELECT Pseudo, COUNT(*) FROM METIERS GROUP BY Pseudo;").fetchall()
+        with self._lock:
+            self._counts = dict(rows)
+            self._pseudos = {}
+            for pseudo in self._counts:
+                self._pseudos.setdefault(normalize(pseudo), []).append(pseudo)
+            self._names.load(self._counts)
+            self._results.clear()
+            self._loaded_at = time.monotonic()
+            self.refreshes += 1
+
+    def dump(self):
+        """
+        Metier counts and name index tables for `restore`, None while never loaded.
+        """
+        with self._lock:
+            if self._loaded_at is None:
+                return None
+            return {"counts": self._counts, "pseudos": self._pseudos, "names": self._names.dump()}
+
+    def restore(self, tables: dict):
+        """
+        Reload from `dump` output, counted as a fresh load for the REFRESH_TTL.
+        """
+        with self._lock:
+            self._counts = tables["counts"]
+            self._pseudos = tables["pseudos"]
+            self._names.restore(tables["names"])
+            self._results.clear()
+            self._loaded_at = time.monotonic()
+            self.refreshes += 1
+
+    def _expired(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.refresh_ttl
+
+    def added(self, pseudo: str):
+        """A metier was registered for `pseudo`."""
+        with self._lock:
+            self._counts[pseudo] = self._counts.get(pseudo, 0) + 1
+            if self._counts[pseudo] == 1:
+                self._pseudos.setdefault(normalize(pseudo), []).append(pseudo)
+                self._names.add(pseudo)
+                self._results.clear()
+
+    def removed(self, pseudo: str):
+        """A metier was deleted for `pseudo`."""
+        with self._lock:
+            count = self._counts.get(pseudo, 0) - 1
+            if count > 0:
+                self._counts[pseudo] = count
+                return
+            if self._counts.pop(pseudo, None) is None:
+                return
+            key = normalize(pseudo)
+            self._pseudos[key].remove(pseudo)
+            if not self._pseudos[key]:
+                del self._pseudos[key]
+                self._names.remove(pseudo)
+            self._results.clear()
+
+    def search(self, current: str):
+        if self._expired():
+            self.load()
+        key = normalize(current)
+        now = time.monotonic()
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is not None and now - cached[0] <= self.result_ttl:
+                self._results.move_to_end(key)
+                self.hits += 1
+                return cached[1]
+
+            self.misses += 1
+            result = [pseudo for name in self._names.search(key)
+                      for pseudo in self._pseudos.get(normalize(name), (name,))][:MAX_CHOICES]
+            self._results[key] = (now, result)
+            self._results.move_to_end(key)
+            if len(self._results) > self.cache_size:
+                self._results.popitem(last=False)
+                self.evictions += 1
+            return result
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "artisans": len(self._counts),
+            "cached_results": len(self._results),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "refreshes": self.refreshes,
+        }
+
+
+artisans = ArtisanIndex()
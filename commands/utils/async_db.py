@@ -0,0 +1,74 @@
+import asyncio
+import contextvars
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import commands.utils.sql as sql
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_READERS = sql.POOL_SIZE - 1
+
+_read_executor = None
+# One writer thread per guild partition, writes to different database files never wait on each other
+_write_executors = {}
+
+
+def configure(readers: int = DEFAULT_READERS):
+    """
+    (Re)create the executors used by the command handlers.
+
+    Reads run on `readers` threads shared by every guild, writes go through
+    a single writer thread per guild so they queue in order instead of
+    fighting over the sqlite lock. The pools are sized to fit every worker
+    plus one spare connection.
+    """
+    global _read_executor
+    shutdown(wait=True)
+    if sql.get_pool().size < readers + 1:
+        sql.configure_pool(sql.get_pool().path, readers + 1)
+    _read_executor = ThreadPoolExecutor(max_workers=readers, thread_name_prefix='lbg-db-read')
+    logger.info("Async database layer ready (%s readers, 1 writer per guild)", readers)
+
+
+def shutdown(wait: bool = True):
+    global _read_executor
+    for executor in [_read_executor, *_write_executors.values()]:
+        if executor is not None:
+            executor.shutdown(wait=wait)
+    _read_executor = None
+    _write_executors.clear()
+
+
+def _reader():
+    if _read_executor is None:
+        configure()
+    return _read_executor
+
+
+def _writer():
+    key = sql.guild_key()
+    executor = _write_executors.get(key)
+    if executor is None:
+        _reader()
+        executor = _write_executors[key] = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix=f'lbg-db-write-{key or "main"}')
+    return executor
+
+
+def _submit(executor, func, args, kwargs):
+    # run_in_executor does not carry context variables, the current guild must follow the call
+    context = contextvars.copy_context()
+    loop = asyncio.get_running_loop()
+    return loop.run_in_executor(executor, functools.partial(context.run, func, *args, **kwargs))
+
+
+async def run_read(func, *args, **kwargs):
+    """Run a read-only helper off the event loop."""
+    return await _submit(_reader(), func, args, kwargs)
+
+
+async def run_write(func, *args, **kwargs):
+    """Queue a mutating helper on the current guild's writer thread."""
+    return await _submit(_writer(), func, args, kwargs)
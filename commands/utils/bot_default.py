@@ -1,10 +1,17 @@
 import discord
 
 import commands.utils.color as color
+from commands.utils import render
 
 
+@render.static
 def error_generic():
     embed = discord.Embed(title=f"Erreur du bot",
                           color=color.RED)
     embed.description = "<@869961454521049098>"
-    return embed
\ No newline at end of file
+    return embed
+
+
+@render.static
+def not_admin():
+    return discord.Embed(title=f"Commande réservée aux admins", color=color.RED)
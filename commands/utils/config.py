@@ -1,5 +1,165 @@
+import asyncio
+import logging
+import os
+import threading
+from types import MappingProxyType
+
 import yaml
 
-def load_config():
-    with open("config.yml", "r") as stream:
-        return yaml.safe_load(stream)
+logger = logging.getLogger(__name__)
+
+CONFIG_PATH = "config.yml"
+RELOAD_INTERVAL = 5
+
+# key: (type, required)
+SCHEMA = {
+    "token": (str, True),
+    "guild": (int, True),
+    "guilds": (list, False),
+    "sharded": (bool, False),
+    "shard_count": (int, False),
+    "admin_user": (list, True),
+    "db_readers": (int, False),
+    "metrics_file": (str, False),
+    "write_behind": (bool, False),
+    "write_behind_journal": (str, False),
+    "write_behind_interval_ms": ((int, float), False),
+    "write_behind_max_ops": (int, False),
+    "write_behind_fsync": (bool, False),
+    "command_tree_hash_file": (str, False),
+    "reservation_ttl_hours": ((int, float), False),
+    "expiry_channels": (dict, False),
+    "live_board_channels": (dict, False),
+    "event_log_dir": (str, False),
+    "snapshot_file": (str, False),
+    "log_level": (str, False),
+    "log_levels": (dict, False),
+    "log_debug_sample": (int, False),
+}
+
+# Read once at startup, a change needs a restart
+RESTART_KEYS = ("token", "guild", "guilds", "sharded", "shard_count", "db_readers",
+                "write_behind", "write_behind_journal", "event_log_dir")
+
+
+class ConfigError(ValueError):
+    pass
+
+
+def validate(raw) -> MappingProxyType:
+    """
+    Check `raw` against SCHEMA and return it as a read-only mapping, with
+    admin_user as a frozenset of ids.
+
+    :raise ConfigError: on a missing key or a value of the wrong type.
+    """
+    if not isinstance(raw, dict):
+        raise ConfigError("config must be a mapping")
+    for key, (expected, required) in SCHEMA.items():
+        if key not in raw:
+            if required:
+                raise ConfigError(f"missing key '{key}'")
+            continue
+        # bool is an int subclass, do not let `guild: true` through
+        if not isinstance(raw[key], expected) or (isinstance(raw[key], bool) and expected is not bool):
+            raise ConfigError(f"'{key}' has the wrong type ({type(raw[key]).__name__})")
+    if not all(isinstance(user_id, int) for user_id in raw["admin_user"]):
+        raise ConfigError("'admin_user' must be a list of user ids")
+    if not all(isinstance(guild_id, int) for guild_id in raw.get("guilds", ())):
+        raise ConfigError("'guilds' must be a list of guild ids")
+    for key in ("expiry_channels", "live_board_channels"):
+        if not all(isinstance(guild_id, int) and isinstance(channel_id, int)
+                   for guild_id, channel_id in raw.get(key, {}).items()):
+            raise ConfigError(f"'{key}' must map guild ids to channel ids")
+    for level in [raw.get("log_level", "INFO"), *raw.get("log_levels", {}).values()]:
+        if not isinstance(logging.getLevelName(level), int):
+            raise ConfigError(f"unknown log level '{level}'")
+    unknown = raw.keys() - SCHEMA.keys()
+    if unknown:
+        logger.warning("Unknown config keys ignored: %s", ', '.join(sorted(unknown)))
+    return MappingProxyType({**raw, "admin_user": frozenset(raw["admin_user"])})
+
+
+def _parse(path: str) -> MappingProxyType:
+    with open(path, "r") as stream:
+        return validate(yaml.safe_load(stream))
+
+
+class ConfigService:
+    """
+    Parsed config.yml, loaded on first use and swapped for a new snapshot when
+    the file's mtime changes. Snapshots are immutable, readers never see a
+    partially reloaded config.
+    """
+
+    def __init__(self, path: str = CONFIG_PATH):
+        self.path = path
+        self._snapshot = None
+        self._mtime = None
+        self._lock = threading.Lock()
+        self._listeners = []
+
+    def on_reload(self, callback):
+        """
+        Call `callback(snapshot)` after every successful reload, for the keys applied without a restart.
+        """
+        self._listeners.append(callback)
+
+    def get(self) -> MappingProxyType:
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._mtime = os.stat(self.path).st_mtime_ns
+                    self._snapshot = _parse(self.path)
+                snapshot = self._snapshot
+        return snapshot
+
+    def reload_if_changed(self) -> bool:
+        """
+        Re-read the file if its mtime moved. An invalid file is logged and the
+        previous snapshot is kept.
+        """
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError as e:
+            logger.error("Cannot stat config '%s': %s", self.path, e)
+            return False
+        if mtime == self._mtime:
+            return False
+        with self._lock:
+            self._mtime = mtime
+            try:
+                snapshot = _parse(self.path)
+            except (OSError, yaml.YAMLError, ConfigError) as e:
+                logger.error("Config '%s' not reloaded: %s", self.path, e)
+                return False
+            old, self._snapshot = self._snapshot, snapshot
+        if old is not None:
+            changed = [key for key in RESTART_KEYS if old.get(key) != snapshot.get(key)]
+            if changed:
+                logger.warning("Config keys %s changed, restart the bot to apply them", ', '.join(changed))
+        logger.info("Config '%s' reloaded", self.path)
+        for callback in self._listeners:
+            callback(snapshot)
+        return True
+
+    async def watch_forever(self, interval: float = RELOAD_INTERVAL):
+        """
+        Background task polling the file's mtime every `interval` seconds; the
+        stat and parse run in the default executor.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            await loop.run_in_executor(None, self.reload_if_changed)
+
+
+config = ConfigService()
+
+
+def load_config() -> MappingProxyType:
+    """
+    Current config snapshot, parsed on the first call only.
+    """
+    return config.get()
@@ -0,0 +1,101 @@
+import heapq
+import threading
+from bisect import bisect_right
+
+import commands.utils.sql as sql
+from commands.utils import dofus_const
+
+# Lower bound of each level bucket
+LEVEL_BUCKETS = (1, 100, 150, 180, 200)
+TOP_ARTISANS = 3
+
+
+def bucket(level: int) -> int:
+    return max(0, bisect_right(LEVEL_BUCKETS, level) - 1)
+
+
+class CoverageMatrix:
+    """
+    Artisan counts per metier and level bucket, plus the best artisans of each
+    metier, kept in memory for the /metier overview.
+
+    Loaded once from METIERS, then maintained by the metier helpers on every
+    register, update and delete so reading it never touches the database.
+    `version` changes with every change of the matrix.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self._lock = threading.Lock()
+        self._levels = {}
+        self._counts = {}
+        self._top = {}
+
+    def load(self, rows=None):
+        """
+        Rebuild from `rows` of (metier, pseudo, level), read from METIERS by default.
+        """
+        if rows is None:
+            with sql.get_connection() as connection_obj:
+                rows = connection_obj.execute("SELECT Metier, Pseudo, Level FROM METIERS;").fetchall()
+        levels = {metier: {} for metier in dofus_const.METIERS}
+        counts = {metier: [0] * len(LEVEL_BUCKETS) for metier in dofus_const.METIERS}
+        for metier, pseudo, level in rows:
+            levels.setdefault(metier, {})[pseudo] = level
+            counts.setdefault(metier, [0] * len(LEVEL_BUCKETS))[bucket(level)] += 1
+        with self._lock:
+            self._levels, self._counts, self._top = levels, counts, {}
+            self.version += 1
+
+    def set(self, metier: str, pseudo: str, level: int):
+        with self._lock:
+            levels = self._levels.setdefault(metier, {})
+            counts = self._counts.setdefault(metier, [0] * len(LEVEL_BUCKETS))
+            previous = levels.get(pseudo)
+            if previous is not None:
+                counts[bucket(previous)] -= 1
+            levels[pseudo] = level
+            counts[bucket(level)] += 1
+            self._top.pop(metier, None)
+            self.version += 1
+
+    def remove(self, metier: str, pseudo: str):
+        with self._lock:
+            previous = self._levels.get(metier, {}).pop(pseudo, None)
+            if previous is not None:
+                self._counts[metier][bucket(previous)] -= 1
+                self._top.pop(metier, None)
+                self.version += 1
+
+    def dump(self) -> dict:
+        with self._lock:
+            return {"levels": self._levels, "counts": self._counts}
+
+    def restore(self, tables: dict):
+        with self._lock:
+            self._levels, self._counts, self._top = tables["levels"], tables["counts"], {}
+            self.version += 1
+
+    def counts(self, metier: str) -> tuple:
+        with self._lock:
+            return tuple(self._counts.get(metier, [0] * len(LEVEL_BUCKETS)))
+
+    def top(self, metier: str) -> tuple:
+        """
+        (pseudo, level) of the TOP_ARTISANS best artisans, recomputed only after a change of this metier.
+        """
+        with self._lock:
+            top = self._top.get(metier)
+            if top is None:
+                levels = self._levels.get(metier, {})
+                top = self._top[metier] = tuple(
+                    heapq.nsmallest(TOP_ARTISANS, levels.items(), key=lambda item: (-item[1], item[0])))
+            return top
+
+    def snapshot(self) -> dict:
+        """
+        {metier: (bucket counts, top artisans)} for every metier with a row or in dofus_const.METIERS.
+        """
+        with self._lock:
+            metiers = list(self._counts)
+        return {metier: (self.counts(metier), self.top(metier)) for metier in metiers}
@@ -5,4 +5,24 @@ METIERS = [
     "Chasseur", "Cordomage", "Cordonnier", "Costumage", "Façonneur", "Forgemage",
     "Forgeur", "Joaillomage", "Mineur", "Paysan", "Pêcheur", "Poissonnier",
     "Sculptemage", "Sculpteur", "Tailleur"
-]
\ No newline at end of file
+]
+
+# Short or alternate names players use, matched case and accent insensitively
+METIER_ALIASES = {
+    "alchi": "Alchimiste",
+    "bijou": "Bijoutier",
+    "bricolo": "Bricoleur",
+    "cm": "Cordomage",
+    "cordo": "Cordonnier",
+    "costu": "Costumage",
+    "faco": "Façonneur",
+    "fm": "Forgemage",
+    "forgemagie": "Forgemage",
+    "forgeron": "Forgeur",
+    "jm": "Joaillomage",
+    "joaillo": "Joaillomage",
+    "peche": "Pêcheur",
+    "poisso": "Poissonnier",
+    "sm": "Sculptemage",
+    "couturier": "Tailleur",
+}
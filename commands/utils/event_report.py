@@ -0,0 +1,89 @@
+"""
+Offline report of the audit event log written by commands.utils.events.
+
+Streams the JSONL files one line at a time, so memory grows with the number
+of distinct zones and artisans, not with the size of the log.
+
+    python -m commands.utils.event_report events/
+    python -m commands.utils.event_report events/ --guild 123456789 --since 2024-06-01 --top 20
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from collections import Counter, defaultdict
+
+from commands.utils import events
+
+
+def iter_events(directory: str, guild: int = None, since: float = None):
+    """
+    Yield the event dicts of every log file of `directory`, oldest file first.
+    Lines cut short by a crash are skipped.
+    """
+    for path in sorted(glob.glob(os.path.join(directory, f"{events.FILE_PREFIX}*.jsonl"))):
+        with open(path, encoding="utf-8") as stream:
+            for line in stream:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                if guild is not None and event.get("guild") != guild:
+                    continue
+                if since is not None and event.get("ts", 0) < since:
+                    continue
+                yield event
+
+
+def analyze(stream) -> dict:
+    """
+    Per-zone reservation counts, per-artisan counts by event kind and the totals by kind.
+    """
+    zones = Counter()
+    artisans = defaultdict(Counter)
+    kinds = Counter()
+    for event in stream:
+        kind = event.get("kind")
+        kinds[kind] += 1
+        if kind == events.RESERVE:
+            zones[event.get("zone")] += 1
+        if event.get("user"):
+            artisans[event["user"]][kind] += 1
+    return {"zones": zones, "artisans": artisans, "kinds": kinds}
+
+
+def print_report(report: dict, top: int):
+    print("Events by kind")
+    for kind, count in report["kinds"].most_common():
+        print(f"  {kind:<16} {count:>8}")
+
+    print(f"\nMost reserved zones (top {top})")
+    for zone_name, count in report["zones"].most_common(top):
+        print(f"  {count:>8}  {zone_name}")
+
+    print(f"\nMost active artisans (top {top})")
+    activity = Counter({user: sum(kinds.values()) for user, kinds in report["artisans"].items()})
+    for user, total in activity.most_common(top):
+        detail = ", ".join(f"{kind} {count}" for kind, count in report["artisans"][user].most_common())
+        print(f"  {total:>8}  {user} ({detail})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("directory", nargs="?", default=events.EVENT_LOG_DIR)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--guild", type=int, help="only the events of this guild id")
+    parser.add_argument("--since", help="only the events from this date on, YYYY-MM-DD")
+    args = parser.parse_args(argv)
+
+    since = time.mktime(time.strptime(args.since, "%Y-%m-%d")) if args.since else None
+    if not os.path.isdir(args.directory):
+        parser.error(f"{args.directory} is not a directory")
+    print_report(analyze(iter_events(args.directory, args.guild, since)), args.top)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,150 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+import commands.utils.sql as sql
+
+logger = logging.getLogger(__name__)
+
+EVENT_LOG_DIR = 'events'
+FLUSH_INTERVAL = 1.0
+MAX_FILE_BYTES = 64 * 1024 * 1024
+FILE_PREFIX = 'events-'
+
+# Event kinds
+RESERVE = "reserve"
+UNRESERVE = "unreserve"
+FREE = "free"
+EXPIRE = "expire"
+ZONE_ADD = "zone_add"
+ZONE_DELETE = "zone_delete"
+METIER_REGISTER = "metier_register"
+METIER_UPDATE = "metier_update"
+METIER_DELETE = "metier_delete"
+
+
+class Event:
+    """
+    One audit record. Subclasses only add slots, `to_dict` walks them all.
+    """
+    __slots__ = ("ts", "kind", "guild", "user")
+
+    def __init__(self, kind: str, user: str, guild: int = None):
+        self.ts = time.time()
+        self.kind = kind
+        # Partition keys use None for the primary guild, the log always gets a real id
+        self.guild = sql.guild_id(guild)
+        self.user = user
+
+    def to_dict(self) -> dict:
+        return {slot: getattr(self, slot) for cls in type(self).__mro__ for slot in getattr(cls, "__slots__", ())}
+
+
+class ZoneEvent(Event):
+    __slots__ = ("zone",)
+
+    def __init__(self, kind: str, zone: str, user: str, guild: int = None):
+        super().__init__(kind, user, guild)
+        self.zone = zone
+
+
+class MetierEvent(Event):
+    __slots__ = ("metier", "level")
+
+    def __init__(self, kind: str, metier: str, user: str, level: int = None, guild: int = None):
+        super().__init__(kind, user, guild)
+        self.metier = metier
+        self.level = level
+
+
+class EventWriter:
+    """
+    Buffered JSONL writer running on its own thread.
+
+    `emit` only enqueues the record, so the command path never formats or
+    touches the disk. The thread drains the queue, writes everything pending
+    in one go and flushes at most every `flush_interval` seconds. It rotates
+    to a new `events-<timestamp>.jsonl` file once the current one exceeds
+    `max_bytes`.
+    """
+
+    def __init__(self, directory: str = EVENT_LOG_DIR, flush_interval: float = FLUSH_INTERVAL,
+                 max_bytes: int = MAX_FILE_BYTES):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._stream = None
+        self.written = 0
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="lbg-events", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Write every queued event and close the current file."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def emit(self, event: Event):
+        self._queue.put(event)
+
+    def _open(self):
+        path = os.path.join(self.directory, f"{FILE_PREFIX}{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.jsonl")
+        self._stream = open(path, "a", encoding="utf-8", buffering=1024 * 1024)
+
+    def _run(self):
+        self._open()
+        stopping = False
+        while not stopping:
+            batch = []
+            try:
+                batch.append(self._queue.get(timeout=self.flush_interval))
+                while True:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            if None in batch:
+                stopping = True
+                batch = [event for event in batch if event is not None]
+            if batch:
+                try:
+                    self._stream.write("".join(json.dumps(event.to_dict(), separators=(",", ":")) + "\n"
+                                               for event in batch))
+                    self._stream.flush()
+                    self.written += len(batch)
+                    if self._stream.tell() >= self.max_bytes:
+                        self._stream.close()
+                        self._open()
+                except OSError as e:
+                    logger.error("Dropped %s audit events: %s", len(batch), e)
+        self._stream.close()
+
+
+writer = None
+
+
+def start(directory: str = EVENT_LOG_DIR):
+    global writer
+    writer = EventWriter(directory)
+    writer.start()
+
+
+def stop():
+    if writer is not None:
+        writer.stop()
+
+
+def emit(event: Event):
+    """
+    Queue `event` for the audit log, a no-op while the log is off.
+    """
+    if writer is not None:
+        writer.emit(event)
@@ -0,0 +1,137 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from datetime import datetime
+
+import commands.utils.sql as sql
+from commands.utils import async_db
+from commands.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+RESERVATION_TTL = 24 * 3600
+# Reservations expiring within this many seconds of the next one are freed in the same batch
+BATCH_WINDOW = 5
+
+
+class ExpiryScheduler:
+    """
+    Frees the reservations older than `ttl` seconds.
+
+    Active reservations sit in a min-heap of (deadline, guild, zone, pseudo) and
+    the task sleeps until the earliest deadline, or until a new reservation
+    is scheduled, without ever scanning ZONES. An unreserve does not touch
+    the heap: `_deadlines` keeps the deadline of each zone's current
+    reservation and popped entries that no longer match it are dropped.
+
+    Every reservation due at wake-up is freed in one transaction per guild,
+    then `notify(guild_key, freed)` is awaited once with the whole list
+    (guild_key is None for the primary guild, see sql.guild_key).
+    """
+
+    def __init__(self, ttl: float = RESERVATION_TTL, notify=None):
+        self.ttl = ttl
+        self.notify = notify
+        self._heap = []
+        self._deadlines = {}
+        # Tie-breaker so equal deadlines never compare guild keys
+        self._order = itertools.count()
+        self._loop = None
+        self._wakeup = None
+        self.expired = 0
+
+    def __len__(self):
+        return len(self._deadlines)
+
+    # Called from any thread (the writer threads run reserve_zone/unreserve_zone)
+
+    def schedule(self, zone_name: str, user: str, reserved_at: float = None):
+        if self._loop is None:
+            return
+        deadline = (time.time() if reserved_at is None else reserved_at) + self.ttl
+        self._loop.call_soon_threadsafe(self._push, deadline, sql.guild_key(), zone_name, user)
+
+    def cancel(self, zone_name: str):
+        if self._loop is None:
+            return
+        self._loop.call_soon_threadsafe(self._deadlines.pop, (sql.guild_key(), zone_name), None)
+
+    # Event loop side
+
+    def _push(self, deadline: float, guild_key, zone_name: str, user: str):
+        self._deadlines[(guild_key, zone_name)] = deadline
+        heapq.heappush(self._heap, (deadline, next(self._order), guild_key, zone_name, user))
+        if self._heap[0][0] == deadline:
+            self._wakeup.set()
+
+    def _pop_due(self, now: float) -> dict:
+        """
+        Pop every live entry due before `now` + BATCH_WINDOW, grouped by guild.
+        """
+        due = {}
+        while self._heap and self._heap[0][0] <= now + BATCH_WINDOW:
+            deadline, _, guild_key, zone_name, user = heapq.heappop(self._heap)
+            if self._deadlines.get((guild_key, zone_name)) != deadline:
+                continue
+            del self._deadlines[(guild_key, zone_name)]
+            due.setdefault(guild_key, []).append((zone_name, user))
+        return due
+
+    async def load(self, guild_ids: list):
+        """
+        Schedule the reservations already in the databases, from their Lock.Date.
+        """
+        for guild_id in guild_ids:
+            with sql.use_guild(guild_id):
+                rows = await async_db.run_read(current_reservations)
+                for zone_name, user, date in rows:
+                    reserved_at = datetime.strptime(date, '%Y-%m-%d %H:%M:%S').timestamp()
+                    self._push(reserved_at + self.ttl, sql.guild_key(), zone_name, user)
+        logger.info("Expiry scheduler tracking %s reservations", len(self))
+
+    async def run(self, guild_ids: list = ()):
+        """
+        Background task, see the class docstring.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        await self.load(guild_ids)
+        while True:
+            self._wakeup.clear()
+            if self._heap:
+                timeout = max(0.0, self._heap[0][0] - time.time())
+            else:
+                timeout = None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+                continue
+            except asyncio.TimeoutError:
+                pass
+            for guild_key, reservations in self._pop_due(time.time()).items():
+                try:
+                    await self._expire(guild_key, reservations)
+                except Exception as e:
+                    logger.error("Error expiring %s reservations: %s", len(reservations), e)
+
+    async def _expire(self, guild_key, reservations: list):
+        # Imported here, percepteur imports this module to schedule its reservations
+        import commands.utils.percepteur as pc
+
+        with sql.use_guild(sql.guild_id(guild_key)):
+            with metrics.measure("expiry.batch"):
+                freed = await async_db.run_write(pc.free_expired, reservations)
+            self.expired += len(freed)
+            logger.info("Expired %s reservations out of %s due", len(freed), len(reservations))
+            if freed and self.notify is not None:
+                await self.notify(guild_key, freed)
+
+
+def current_reservations():
+    with sql.get_connection() as connection_obj:
+        return connection_obj.execute("SELECT ZONE, Pseudo, Date FROM Lock WHERE Released IS NULL;").fetchall()
+
+
+# Started by main when reservation_ttl_hours is not 0, a no-op until then
+scheduler = ExpiryScheduler()
@@ -0,0 +1,61 @@
+import threading
+
+import commands.utils.sql as sql
+from commands.utils import snapshot
+from commands.utils.artisan_index import ArtisanIndex, artisans
+from commands.utils.coverage import CoverageMatrix
+from commands.utils.occupancy import Occupancy
+from commands.utils.query_cache import QueryCache
+from commands.utils.zone_index import ZoneIndex, zones
+
+
+class GuildState:
+    """
+    In-memory data of one guild: autocomplete indexes, query caches and the
+    optional write-behind journal, so a busy guild never evicts or
+    invalidates another guild's entries.
+    """
+
+    def __init__(self, zone_index: ZoneIndex = None, artisan_index: ArtisanIndex = None):
+        self.zones = ZoneIndex() if zone_index is None else zone_index
+        self.artisans = ArtisanIndex() if artisan_index is None else artisan_index
+        # (metier, level, cursor) -> page rows, tagged by metier
+        self.artisans_cache = QueryCache("list_artisans")
+        # metier x level bucket counts for /metier overview
+        self.coverage = CoverageMatrix()
+        # zone -> (holder, since) of the reserved zones, for the boards
+        self.occupancy = Occupancy()
+        # write_behind.WriteBehind, when set reserve/unreserve/free go through its journal
+        self.write_behind = None
+
+
+_states = {}
+_lock = threading.Lock()
+
+
+def state() -> GuildState:
+    """
+    State of the current guild (see sql.current_guild), created and its zone
+    index, coverage matrix and occupancy loaded on first use, from the
+    snapshot left by the last shutdown when it is still current. The primary
+    guild keeps the module-level indexes.
+    """
+    key = sql.guild_key()
+    current = _states.get(key)
+    if current is None:
+        with _lock:
+            current = _states.get(key)
+            if current is None:
+                current = GuildState(zones, artisans) if key is None else GuildState()
+                if not snapshot.restore(current):
+                    current.zones.load()
+                    current.coverage.load()
+                # Reservations come and go by the minute, always read them fresh
+                current.occupancy.load()
+                _states[key] = current
+    return current
+
+
+def states() -> dict:
+    with _lock:
+        return dict(_states)
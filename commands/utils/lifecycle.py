@@ -0,0 +1,55 @@
+import logging
+import signal
+import sqlite3
+
+import commands.utils.sql as sql
+from commands.utils import async_db
+from commands.utils import events
+from commands.utils import guilds
+from commands.utils import snapshot
+
+logger = logging.getLogger(__name__)
+
+
+def shutdown():
+    """
+    Persist everything once no command can come in any more, in order:
+    finish the queued database work, flush the write-behind journals and the
+    audit log, snapshot the warm caches of every guild, checkpoint the WAL and
+    close the pools. Blocking, each step waits for the previous one.
+    """
+    async_db.shutdown(wait=True)
+    states = guilds.states()
+    for key, state in states.items():
+        if state.write_behind:
+            with sql.use_guild(key):
+                state.write_behind.stop()
+    events.stop()
+
+    for key, state in states.items():
+        with sql.use_guild(key):
+            try:
+                snapshot.save(state)
+            except (OSError, sqlite3.Error) as e:
+                logger.error("Snapshot of guild %s not written: %s", key or "main", e)
+
+    for key, pool in sql.guild_pools().items():
+        with sql.use_guild(key):
+            try:
+                sql.checkpoint()
+            except sqlite3.Error as e:
+                logger.error("WAL checkpoint of '%s' failed: %s", pool.path, e)
+        pool.close()
+    logger.info("Shutdown complete")
+
+
+def install_signal_handlers(loop, close):
+    """
+    Run the coroutine function `close` on SIGTERM and SIGINT instead of dying mid-write.
+    """
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(signum, lambda: loop.create_task(close()))
+        except NotImplementedError:
+            # Windows event loops: Ctrl+C still ends client.run, which closes the client
+            pass
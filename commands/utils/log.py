@@ -0,0 +1,101 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+import threading
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+DEFAULT_LEVEL = "INFO"
+# Per-row debug logs only let one call out of DEBUG_SAMPLE through
+DEBUG_SAMPLE = 100
+
+listener = None
+debug_sample = DEBUG_SAMPLE
+# Loggers given a level by log_levels
+_configured = set()
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # The stock prepare formats the message on the calling thread, leave it to the listener.
+        # Records stay in this process, and callers only pass immutable values as arguments.
+        return record
+
+
+def setup(cfg=None, handler: logging.Handler = None):
+    """
+    Route every record through a QueueHandler on the root logger. Formatting
+    and the console write happen on the QueueListener thread, so a log call
+    on the event loop only costs the level check and a queue put.
+
+    Levels come from cfg["log_level"] for the root logger and
+    cfg["log_levels"] ({logger name: level}) per module. Records go to
+    `handler`, the console by default.
+    """
+    global listener
+    cfg = cfg or {}
+    if listener is None:
+        log_queue = queue.SimpleQueue()
+        handler = handler or logging.StreamHandler()
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+        root = logging.getLogger()
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+        root.addHandler(_QueueHandler(log_queue))
+        listener.start()
+        atexit.register(stop)
+    apply_levels(cfg)
+
+
+def apply_levels(cfg):
+    """
+    Set the levels of cfg, also used when the config is hot-reloaded.
+    Loggers no longer listed go back to inheriting the root level.
+    """
+    global debug_sample
+    logging.getLogger().setLevel(cfg.get("log_level", DEFAULT_LEVEL))
+    levels = cfg.get("log_levels", {})
+    for name in _configured - levels.keys():
+        logging.getLogger(name).setLevel(logging.NOTSET)
+    for name, level in levels.items():
+        logging.getLogger(name).setLevel(level)
+    _configured.clear()
+    _configured.update(levels)
+    debug_sample = max(1, cfg.get("log_debug_sample", DEBUG_SAMPLE))
+
+
+def stop():
+    """
+    Write out the queued records, stop the listener thread and detach the queue handler.
+    """
+    global listener
+    if listener is not None:
+        root = logging.getLogger()
+        for handler in root.handlers[:]:
+            if isinstance(handler, _QueueHandler):
+                root.removeHandler(handler)
+        listener.stop()
+        listener = None
+
+
+class Sampled:
+    """
+    Debug logger for per-row messages: nothing is formatted unless DEBUG is
+    enabled for `logger`, and then only one call out of `debug_sample` is logged.
+    """
+
+    def __init__(self, logger: logging.Logger):
+        self.logger = logger
+        self._calls = 0
+        self._lock = threading.Lock()
+
+    def debug(self, msg: str, *args):
+        if not self.logger.isEnabledFor(logging.DEBUG):
+            return
+        with self._lock:
+            self._calls += 1
+            if self._calls < debug_sample:
+                return
+            self._calls = 0
+        self.logger.debug(msg, *args)
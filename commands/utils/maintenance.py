@@ -0,0 +1,52 @@
+import asyncio
+import logging
+import sqlite3
+import time
+
+import commands.utils.percepteur as pc
+import commands.utils.sql as sql
+from commands.utils import async_db
+
+logger = logging.getLogger(__name__)
+
+COMPACT_INTERVAL = 3600
+VACUUM_INTERVAL = 7 * 24 * 3600
+
+
+async def compact_locks():
+    """
+    Archive every released Lock row, one batch per writer job so reservations
+    queued meanwhile are not held behind the whole compaction.
+    """
+    moved = 0
+    while True:
+        batch = await async_db.run_write(pc.compact_lock_history)
+        moved += batch
+        if batch < pc.COMPACT_BATCH_SIZE:
+            return moved
+
+
+async def maintenance_loop(compact_interval: float = COMPACT_INTERVAL, vacuum_interval: float = VACUUM_INTERVAL):
+    """
+    Background task: compact the Lock history of every guild database each
+    `compact_interval` seconds, refresh the planner statistics when rows moved
+    and VACUUM every `vacuum_interval`.
+    """
+    last_vacuum = time.monotonic()
+    while True:
+        await asyncio.sleep(compact_interval)
+        vacuum = time.monotonic() - last_vacuum >= vacuum_interval
+        for guild_key, pool in sql.guild_pools().items():
+            with sql.use_guild(guild_key):
+                try:
+                    moved = await compact_locks()
+                    if moved:
+                        await async_db.run_write(sql.analyze)
+                        logger.info("Archived %s released reservations in '%s'", moved, pool.path)
+                    if vacuum:
+                        await async_db.run_write(sql.vacuum)
+                        logger.info("Database '%s' vacuumed", pool.path)
+                except sqlite3.Error as e:
+                    logger.error("Error during maintenance of '%s': %s", pool.path, e)
+        if vacuum:
+            last_vacuum = time.monotonic()
@@ -5,14 +5,31 @@ import discord
 
 import commands.utils.color as color
 import commands.utils.bot_default as bf
+import commands.utils.sql as sql
+from commands.utils import metrics
+from commands.utils import guilds
+from commands.utils.zone_index import ZoneIndex
+from commands.utils import dofus_const
+from commands.utils.coverage import LEVEL_BUCKETS
+from commands.utils import render
+from commands.utils import events
+from commands.utils import log
+from commands.utils.events import MetierEvent
 
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+row_logger = log.Sampled(logger)
 
+PAGE_SIZE = 20
+MAX_LEVEL = 200
 
+metier_names = ZoneIndex('metiers')
+metier_names.load(dofus_const.METIERS, dofus_const.METIER_ALIASES.items())
+
+
+@metrics.timed()
 def register(metier: str, user: str, level: int):
-    connection_obj = sqlite3.connect('lbg.db')
+    connection_obj = sql.get_pool().acquire()
     cursor_obj = connection_obj.cursor()
-    cursor_obj.execute("PRAGMA foreign_keys = ON;")
     current_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
     embed = bf.error_generic()
@@ -23,51 +40,60 @@ def register(metier: str, user: str, level: int):
             (user, metier, level, current_date, current_date)
         )
         connection_obj.commit()
-        logging.info(f"{user} registered '{metier}:{level}' successfully.")
+        invalidate(metier, user)
+        guilds.state().artisans.added(user)
+        guilds.state().coverage.set(metier, user, level)
+        events.emit(MetierEvent(events.METIER_REGISTER, metier, user, level))
+        logger.info("%s registered '%s:%s' successfully.", user, metier, level)
         embed = discord.Embed(title=f"Métier Enregistré", color=color.GREEN)
         embed.add_field(name=f"Metier: {metier} ", value=f"Lvl: {level}", inline=False)
 
     except sqlite3.IntegrityError as e:
         if "UNIQUE constraint failed" in str(e):
-            logging.info(f"Error: '{metier}' is already registered for user '{user}'.")
+            logger.info("Error: '%s' is already registered for user '%s'.", metier, user)
             embed = discord.Embed(title=f"Métier déja enregistré", color=color.YELLOW)
         else:
-            logging.info(f"Error registering metier '{metier}:{level} from {user}': {e}")
+            logger.info("Error registering metier '%s:%s from %s': %s", metier, level, user, e)
     finally:
+        sql.get_pool().release(connection_obj)
         return embed
 
 
+@metrics.timed()
 def delete(metier: str, user: str):
-    connection_obj = sqlite3.connect('lbg.db')
+    connection_obj = sql.get_pool().acquire()
     cursor_obj = connection_obj.cursor()
-    cursor_obj.execute("PRAGMA foreign_keys = ON;")
 
     embed = bf.error_generic()
 
     try:
-        cursor_obj.execute("DELETE FROM METIERS WHERE Metier = ?;", (metier,))
-        changes = connection_obj.total_changes
+        cursor_obj.execute("DELETE FROM METIERS WHERE Pseudo = ? AND Metier = ?;", (user, metier))
+        changes = cursor_obj.rowcount
         connection_obj.commit()
         if changes > 0:
+            invalidate(metier, user)
+            guilds.state().artisans.removed(user)
+            guilds.state().coverage.remove(metier, user)
+            events.emit(MetierEvent(events.METIER_DELETE, metier, user))
             embed = discord.Embed(title=f"Métier supprimé", color=color.GREEN)
             embed.add_field(name=f"Metier: {metier}", inline=False)
-            logging.info(f"{user} deleted '{metier}' successfully.")
+            logger.info("%s deleted '%s' successfully.", user, metier)
         else:
             embed = discord.Embed(title=f"Métier non trouvé", color=color.YELLOW)
-            logging.info(f"'{metier}' for {user} not found.")
+            logger.info("'%s' for %s not found.", metier, user)
 
     except sqlite3.IntegrityError as e:
-        logging.info(f"Error updating metier '{metier}': {e}")
+        logger.info("Error updating metier '%s': %s", metier, e)
 
     finally:
-        connection_obj.close()
+        sql.get_pool().release(connection_obj)
         return embed
 
 
+@metrics.timed()
 def update(metier: str, user: str, level: int):
-    connection_obj = sqlite3.connect('lbg.db')
+    connection_obj = sql.get_pool().acquire()
     cursor_obj = connection_obj.cursor()
-    cursor_obj.execute("PRAGMA foreign_keys = ON;")
     current_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
     embed = bf.error_generic()
@@ -81,104 +107,293 @@ def update(metier: str, user: str, level: int):
             """,
             (level, current_date, user, metier)
         )
+        changes = cursor_obj.rowcount
         connection_obj.commit()
+        invalidate(metier, user)
+        if changes > 0:
+            guilds.state().coverage.set(metier, user, level)
+            events.emit(MetierEvent(events.METIER_UPDATE, metier, user, level))
         embed = discord.Embed(title=f"Métier Mis à jours", color=color.GREEN)
         embed.add_field(name=f"Metier: {metier} ", value=f"Lvl: {level}", inline=False)
 
-        logging.info(f"{user} Updated '{metier}:{level}' successfully.")
+        logger.info("%s Updated '%s:%s' successfully.", user, metier, level)
 
     except sqlite3.IntegrityError as e:
-        logging.info(f"Error updating metier '{metier}': {e}")
+        logger.info("Error updating metier '%s': %s", metier, e)
 
     finally:
-        connection_obj.close()
+        sql.get_pool().release(connection_obj)
         return embed
 
 
-def list_artisans(metier: str, level: int):
-    connection_obj = sqlite3.connect('lbg.db')
+def parse_metier_levels(text: str):
+    """
+    Parse a bulk entry like "Forgemage:200, Mineur:180, Paysan:200".
+    Metier names are matched case and accent insensitively against dofus_const.METIERS
+    and their aliases, an unknown name is reported with the closest metier.
+    A metier given twice keeps its first level, the later entries are reported.
+    :return: ({metier: level}, [entries that could not be parsed])
+    """
+    levels, errors = {}, []
+    for entry in text.replace(';', ',').split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        name, _, level = entry.partition(':')
+        level = level.strip()
+        metier = metier_names.resolve(name)
+        # isdigit alone accepts "²" and other digits int() rejects
+        if metier is None or not (level.isascii() and level.isdigit()) or not 1 <= int(level) <= MAX_LEVEL:
+            suggestions = metier_names.suggest(name, 1) if metier is None else []
+            errors.append(f"{entry} ({suggestions[0]} ?)" if suggestions else entry)
+            continue
+        if metier in levels:
+            errors.append(f"{entry} (doublon de {metier})")
+            continue
+        levels[metier] = int(level)
+    return levels, errors
+
+
+def upsert_many(user: str, levels: dict):
+    """
+    Register or update several metiers of `user` in a single transaction.
+    :return: (inserted metiers, updated metiers)
+    """
+    connection_obj = sql.get_pool().acquire()
     cursor_obj = connection_obj.cursor()
-    cursor_obj.execute("PRAGMA foreign_keys = ON;")
-    embed = bf.error_generic()
+    current_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
     try:
-        cursor_obj.execute(
-            "SELECT Pseudo, Metier, Level, DateCreated, DateUpdated FROM METIERS WHERE Metier = ? AND Level > ?;",
-            (metier, level)
+        cursor_obj.execute("BEGIN IMMEDIATE;")
+        cursor_obj.execute("SELECT Metier FROM METIERS WHERE Pseudo = ?;", (user,))
+        existing = {row[0] for row in cursor_obj.fetchall()}
+        cursor_obj.executemany(
+            """
+            INSERT INTO METIERS (Pseudo, Metier, Level, DateCreated, DateUpdated) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (Pseudo, Metier) DO UPDATE SET Level = excluded.Level, DateUpdated = excluded.DateUpdated;
+            """,
+            [(user, metier, level, current_date, current_date) for metier, level in levels.items()]
         )
-        rows = cursor_obj.fetchall()
-
-        if rows:
-            embed = discord.Embed(title=f"Artisans de proffession {metier} avec le level mini {level}",
-                                  color=color.BLUE)
-            logging.info(f"Listing users register as Worker on '{metier}' and level greater than {level}:")
+        connection_obj.commit()
+    finally:
+        sql.get_pool().release(connection_obj)
+
+    inserted = [metier for metier in levels if metier not in existing]
+    updated = [metier for metier in levels if metier in existing]
+    for metier, level in levels.items():
+        invalidate(metier, user)
+        guilds.state().coverage.set(metier, user, level)
+        events.emit(MetierEvent(events.METIER_UPDATE if metier in existing else events.METIER_REGISTER,
+                                metier, user, level))
+    for _ in inserted:
+        guilds.state().artisans.added(user)
+    return inserted, updated
+
+
+@metrics.timed()
+def bulk_register(entries: str, user: str):
+    levels, errors = parse_metier_levels(entries or '')
+    if not levels:
+        description = "Format attendu: Forgemage:200, Mineur:180"
+        if errors:
+            description = f"Ignorés: {', '.join(errors)}\n{description}"
+        return discord.Embed(title=f"Aucun métier reconnu", color=color.YELLOW, description=description)
 
-            for row in rows:
-                logging.info(
-                    f"User: {row[0]}, Metier: {row[1]}, level: {row[2]}, DateCreated: {row[3]}, DateUpdated: {row[4]}")
-                embed.add_field(name=f"Pseudo: {row[0]} ", value=f"level: {row[2]}", inline=False)
+    try:
+        inserted, updated = upsert_many(user, levels)
+    except sqlite3.Error as e:
+        logger.info("Error bulk registering metiers for %s: %s", user, e)
+        return bf.error_generic()
+
+    logger.info("%s bulk registered %s and updated %s metiers.", user, len(inserted), len(updated))
+    embed = discord.Embed(title=f"Métiers Enregistrés", color=color.GREEN)
+    for metier, level in levels.items():
+        state = "nouveau" if metier in inserted else "mis à jour"
+        embed.add_field(name=f"Metier: {metier} ", value=f"Lvl: {level} ({state})", inline=False)
+    if errors:
+        embed.color = color.YELLOW
+        embed.description = f"Ignorés: {', '.join(errors)}"
+    return embed
+
+
+def _select_artisans(metier: str, level: int, after: tuple = None):
+    """
+    One keyset page of artisans ordered by level then pseudo.
+    :param after: (Level, Pseudo) of the last row of the previous page, None for the first page.
+    """
+    connection_obj = sql.get_pool().acquire()
+    cursor_obj = connection_obj.cursor()
+    try:
+        if after is None:
+            cursor_obj.execute(
+                "SELECT Pseudo, Metier, Level, DateCreated, DateUpdated FROM METIERS "
+                "WHERE Metier = ? AND Level > ? ORDER BY Level DESC, Pseudo LIMIT ?;",
+                (metier, level, PAGE_SIZE + 1)
+            )
         else:
-            logging.info(f"No users found with Metier '{metier}' and level greater than {level}.")
-            embed = discord.Embed(title=f"Aucun Artisans de proffession {metier} avec le level mini {level}",
-                                  color=color.YELLOW)
+            cursor_obj.execute(
+                "SELECT Pseudo, Metier, Level, DateCreated, DateUpdated FROM METIERS "
+                "WHERE Metier = ? AND Level > ? AND Level <= ? AND (Level < ? OR Pseudo > ?) "
+                "ORDER BY Level DESC, Pseudo LIMIT ?;",
+                (metier, level, after[0], after[0], after[1], PAGE_SIZE + 1)
+            )
+        # Tuples so the rows can key the render cache
+        return tuple(cursor_obj.fetchall())
+    finally:
+        sql.get_pool().release(connection_obj)
+
+
+def _select_metiers(pseudo: str):
+    connection_obj = sql.get_pool().acquire()
+    cursor_obj = connection_obj.cursor()
+    try:
+        cursor_obj.execute(
+            "SELECT Pseudo, Metier, Level, DateCreated, DateUpdated FROM METIERS WHERE Pseudo = ? ORDER BY Level DESC;",
+            (pseudo,)
+        )
+        return tuple(cursor_obj.fetchall())
+    finally:
+        sql.get_pool().release(connection_obj)
+
+
+def invalidate(metier: str, user: str):
+    """
+    Drop the cached listings a write on (user, metier) can change.
+    """
+    guilds.state().artisans_cache.invalidate(metier)
+
+
+@metrics.timed()
+def artisans_page(metier: str, level: int, after: tuple = None):
+    """
+    Return the rows of one artisans page and the cursor of the next page (None on the last one).
+    """
+    rows = guilds.state().artisans_cache.get_or_load((metier, level, after), metier,
+                                                      _select_artisans, metier, level, after)
+    if len(rows) > PAGE_SIZE:
+        last = rows[PAGE_SIZE - 1]
+        return rows[:PAGE_SIZE], (last[2], last[0])
+    return rows, None
+
+
+@render.cached()
+def render_artisans(metier: str, level: int, rows: tuple, page: int = 1):
+    if rows:
+        embed = discord.Embed(title=f"Artisans de proffession {metier} avec le level mini {level}",
+                              color=color.BLUE)
+        logger.info("Listing users register as Worker on '%s' and level greater than %s, page %s:",
+                    metier, level, page)
+
+        for row in rows:
+            row_logger.debug("User: %s, Metier: %s, level: %s, DateCreated: %s, DateUpdated: %s", *row[:5])
+            embed.add_field(name=f"Pseudo: {row[0]} ", value=f"level: {row[2]}", inline=False)
+        embed.set_footer(text=f"Page {page}")
+    else:
+        logger.info("No users found with Metier '%s' and level greater than %s.", metier, level)
+        embed = discord.Embed(title=f"Aucun Artisans de proffession {metier} avec le level mini {level}",
+                              color=color.YELLOW)
+    return embed
+
+
+@metrics.timed()
+def list_artisans(metier: str, level: int):
+    embed = bf.error_generic()
+
+    try:
+        rows, _ = artisans_page(metier, level)
+        embed = render_artisans(metier, level, rows)
 
     except sqlite3.Error as e:
-        logging.info(f"Error fetching data: {e}")
+        logger.info("Error fetching data: %s", e)
 
     finally:
-        connection_obj.close()
         return embed
 
 
+@render.cached()
+def render_metiers(pseudo: str, rows: tuple):
+    if rows:
+        embed = discord.Embed(title=f"Métier de: {pseudo}", color=color.BLUE)
+        logger.info("Listing all metiers for user '%s':", pseudo)
+        for row in rows:
+            embed.add_field(name=f"Metier: {row[1]} ", value=f"level: {row[2]}", inline=False)
+            row_logger.debug("Metier: %s, level: %s, DateCreated: %s, DateUpdated: %s", *row[1:5])
+    else:
+        embed = discord.Embed(title=f"L'Artisan {pseudo} n'a enregistré aucun métier",
+                              color=color.YELLOW)
+        logger.info("No metiers found for user '%s'.", pseudo)
+    return embed
+
+
+@metrics.timed()
 def list_metiers_by_user(pseudo: str):
-    connection_obj = sqlite3.connect('lbg.db')
-    cursor_obj = connection_obj.cursor()
-    cursor_obj.execute("PRAGMA foreign_keys = ON;")
     embed = bf.error_generic()
 
     try:
-        cursor_obj.execute(
-            "SELECT Pseudo, Metier, Level, DateCreated, DateUpdated FROM METIERS WHERE Pseudo = ? ORDER BY Level DESC;",
-            (pseudo,)
-        )
-        rows = cursor_obj.fetchall()
-        if rows:
-            embed = discord.Embed(title=f"Métier de: {pseudo}", color=color.BLUE)
-            logging.info(f"Listing all metiers for user '{pseudo}':")
-            for row in rows:
-                embed.add_field(name=f"Metier: {row[1]} ", value=f"level: {row[2]}", inline=False)
-                logging.info(f"Metier: {row[1]}, level: {row[2]}, DateCreated: {row[3]}, DateUpdated: {row[4]}")
-
-        else:
-            embed = discord.Embed(title=f"L'Artisan {pseudo} n'a enregistré aucun métier",
-                                  color=color.YELLOW)
-            logging.info(f"No metiers found for user '{pseudo}'.")
-        return rows
+        # Not cached: the index lookup of a few rows costs less than the cache bookkeeping
+        rows = _select_metiers(pseudo)
+        embed = render_metiers(pseudo, rows)
     except sqlite3.Error as e:
-        logging.info(f"Error fetching data: {e}")
+        logger.info("Error fetching data: %s", e)
 
     finally:
-        connection_obj.close()
         return embed
 
 
+@metrics.timed()
+def coverage_overview():
+    """
+    Artisans per metier and level threshold with the best ones, from the
+    in-memory coverage matrix: no query, whatever the number of metiers.
+    """
+    coverage = guilds.state().coverage
+    return _render_overview(coverage, coverage.version)
+
+
+@render.cached(size=16)
+def _render_overview(coverage, version: int):
+    embed = discord.Embed(title="Couverture des métiers", color=color.BLUE)
+    for metier in dofus_const.METIERS:
+        counts = coverage.counts(metier)
+        # "at least" counts, highest bucket first
+        thresholds = []
+        total = 0
+        for lower, count in reversed(list(zip(LEVEL_BUCKETS, counts))):
+            total += count
+            thresholds.append(f"{lower}{'' if lower == MAX_LEVEL else '+'}: {total}")
+        top = ", ".join(f"{pseudo} ({level})" for pseudo, level in coverage.top(metier)) or "aucun artisan"
+        embed.add_field(name=f"{metier}{' ⚠' if not counts[-1] else ''}",
+                        value=f"{' · '.join(thresholds)}\n{top}", inline=False)
+    embed.set_footer(text=f"⚠ : aucun artisan niveau {MAX_LEVEL}")
+    return embed
+
+
+@metrics.timed()
 def get_artisan_list():
-    connection_obj = sqlite3.connect('lbg.db')
+    connection_obj = sql.get_pool().acquire()
     cursor_obj = connection_obj.cursor()
-    cursor_obj.execute("PRAGMA foreign_keys = ON;")
 
     try:
         cursor_obj.execute(
             "SELECT DISTINCT Pseudo FROM METIERS"
         )
         rows = cursor_obj.fetchall()
-        logging.info(f"Found {len(rows)} Artisans registered")
+        logger.info("Found %s Artisans registered", len(rows))
         pseudo_list = [row[0] for row in rows]
 
         return pseudo_list
 
     except sqlite3.Error as e:
-        logging.info(f"Error fetching data: {e}")
+        logger.info("Error fetching data: %s", e)
 
     finally:
-        connection_obj.close()
+        sql.get_pool().release(connection_obj)
+
+
+@metrics.timed()
+def search_artisans(search_string: str):
+    """
+    Autocomplete lookup for artisan pseudos, served from the cached artisan index.
+    :param search_string: What the user typed so far.
+    """
+    return guilds.state().artisans.search(search_string)
@@ -0,0 +1,142 @@
+import asyncio
+import functools
+import inspect
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Latest samples kept per metric to compute the percentiles
+RESERVOIR_SIZE = 2048
+DUMP_INTERVAL = 60
+
+
+class Timer:
+    """
+    Count, error count and recent latencies of one instrumented call site.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.samples = deque(maxlen=RESERVOIR_SIZE)
+
+    def record(self, elapsed: float, failed: bool = False):
+        self.count += 1
+        self.errors += failed
+        self.total += elapsed
+        self.samples.append(elapsed)
+
+    def percentiles(self, *quantiles: float):
+        samples = sorted(self.samples)
+        if not samples:
+            return [0.0 for _ in quantiles]
+        return [samples[min(len(samples) - 1, int(q * len(samples)))] for q in quantiles]
+
+    def summary(self) -> dict:
+        p50, p95, p99 = self.percentiles(0.5, 0.95, 0.99)
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "avg_ms": self.total / self.count * 1000 if self.count else 0.0,
+            "p50_ms": p50 * 1000,
+            "p95_ms": p95 * 1000,
+            "p99_ms": p99 * 1000,
+        }
+
+
+_timers = {}
+_lock = threading.Lock()
+
+
+def _record(name: str, elapsed: float, failed: bool):
+    with _lock:
+        timer = _timers.get(name)
+        if timer is None:
+            timer = _timers[name] = Timer(name)
+        timer.record(elapsed, failed)
+
+
+@contextmanager
+def measure(name: str):
+    """
+    Time the enclosed block under `name`; an exception escaping it counts as an error.
+    """
+    start = time.perf_counter()
+    failed = True
+    try:
+        yield
+        failed = False
+    finally:
+        _record(name, time.perf_counter() - start, failed)
+
+
+def timed(name: str = None):
+    """
+    Decorator timing every call of a sync or async function. The default name
+    is `<module>.<function>`, e.g. `metier.register`.
+    """
+    def decorator(func):
+        metric = name or f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with measure(metric):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with measure(metric):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def snapshot() -> dict:
+    with _lock:
+        return {name: timer.summary() for name, timer in sorted(_timers.items())}
+
+
+def reset():
+    with _lock:
+        _timers.clear()
+
+
+def prometheus_text() -> str:
+    summaries = ["# TYPE lbg_call_seconds summary"]
+    errors = ["# TYPE lbg_call_errors_total counter"]
+    with _lock:
+        for name, timer in sorted(_timers.items()):
+            label = name.replace('"', '')
+            for quantile, value in zip((0.5, 0.95, 0.99), timer.percentiles(0.5, 0.95, 0.99)):
+                summaries.append(f'lbg_call_seconds{{name="{label}",quantile="{quantile}"}} {value:.6f}')
+            summaries.append(f'lbg_call_seconds_sum{{name="{label}"}} {timer.total:.6f}')
+            summaries.append(f'lbg_call_seconds_count{{name="{label}"}} {timer.count}')
+            errors.append(f'lbg_call_errors_total{{name="{label}"}} {timer.errors}')
+    return "\n".join(summaries + errors) + "\n"
+
+
+def write_prometheus(path: str):
+    """
+    Atomically replace `path` with the current metrics in Prometheus text format.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as stream:
+        stream.write(prometheus_text())
+    os.replace(tmp_path, path)
+
+
+async def dump_forever(path: str, interval: float = DUMP_INTERVAL):
+    """
+    Background task rewriting the Prometheus dump file every `interval` seconds.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(interval)
+        await loop.run_in_executor(None, write_prometheus, path)
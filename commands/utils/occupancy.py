@@ -0,0 +1,221 @@
+import asyncio
+import logging
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import deque
+
+import discord
+
+import commands.utils.color as color
+import commands.utils.sql as sql
+from commands.utils import render
+
+logger = logging.getLogger(__name__)
+
+FEED_SIZE = 1024
+BOARD_TITLE = "Occupation des zones"
+# Seconds the live board waits for more changes before editing, and minimum time between two edits
+BOARD_DEBOUNCE = 5
+BOARD_MIN_INTERVAL = 15
+
+
+class Occupancy:
+    """
+    Current holder of every reserved zone of a guild, kept in memory by the
+    percepteur helpers on each reserve, unreserve, free and expiry.
+
+    Each change bumps `version` and is appended to a bounded feed, so a reader
+    holding an older version can fetch only what changed since
+    (`changes_since`) instead of the whole state.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reserved = {}
+        self._feed = deque(maxlen=FEED_SIZE)
+        self._listeners = []
+        self.version = 0
+
+    def load(self):
+        with sql.get_connection() as connection_obj:
+            reserved = {zone_name: (user, date) for zone_name, user, date in connection_obj.execute(
+                "SELECT ZONE, Pseudo, Date FROM Lock WHERE Released IS NULL;")}
+        with self._lock:
+            self._reserved = reserved
+            self._feed.clear()
+            self.version += 1
+        self._notify()
+
+    # Writers, called from the writer threads
+
+    def _change(self, zone_name: str, entry):
+        self.version += 1
+        self._feed.append((self.version, zone_name, entry))
+
+    def reserved(self, zone_name: str, user: str, since: str = None):
+        entry = (user, since or time.strftime('%Y-%m-%d %H:%M:%S'))
+        with self._lock:
+            self._reserved[zone_name] = entry
+            self._change(zone_name, entry)
+        self._notify()
+
+    def freed(self, *zone_names: str):
+        with self._lock:
+            for zone_name in zone_names:
+                if self._reserved.pop(zone_name, None) is not None:
+                    self._change(zone_name, None)
+        self._notify()
+
+    # Readers
+
+    def __len__(self):
+        return len(self._reserved)
+
+    def snapshot(self) -> tuple:
+        """
+        (version, {zone: (holder, since)}) of the reserved zones.
+        """
+        with self._lock:
+            return self.version, dict(self._reserved)
+
+    def changes_since(self, version: int):
+        """
+        (current version, {zone: (holder, since) or None when freed}) of the
+        zones changed after `version`, or None when the feed no longer goes
+        back that far and the caller must start over from `snapshot`.
+        """
+        with self._lock:
+            if version == self.version:
+                return self.version, {}
+            if not self._feed or self._feed[0][0] > version + 1:
+                return None
+            changes = {}
+            for change_version, zone_name, entry in self._feed:
+                if change_version > version:
+                    changes[zone_name] = entry
+            return self.version, changes
+
+    def subscribe(self, callback):
+        """
+        Call `callback()` after every change, from the thread that made it.
+        """
+        self._listeners.append(callback)
+
+    def _notify(self):
+        for callback in self._listeners:
+            callback()
+
+
+def board_line(zone_name: str, entry: tuple) -> str:
+    user, since = entry
+    return f"**{zone_name}** — {user} (depuis {since})"
+
+
+def board_embed(lines, reserved: int, total: int):
+    """
+    Board embed listing the reservation `lines` (already sorted) as long as they fit.
+    """
+    description = render.truncate_lines(lines, reserved)
+    embed = discord.Embed(title=BOARD_TITLE, description=description or "Aucune zone réservée",
+                          color=color.BLUE)
+    embed.set_footer(text=f"{reserved} réservées, {total - reserved} libres sur {total} zones")
+    return embed
+
+
+class LiveBoard:
+    """
+    Pinned board message of one guild, edited when the occupancy changes.
+
+    Changes are coalesced for BOARD_DEBOUNCE seconds and edits are at least
+    BOARD_MIN_INTERVAL seconds apart to stay clear of the Discord rate limits.
+    Only the lines of the zones in the change feed are re-rendered, and no
+    edit is sent when the changes cancel out (reserved then freed).
+    """
+
+    def __init__(self, channel, guild_id: int, debounce: float = BOARD_DEBOUNCE,
+                 min_interval: float = BOARD_MIN_INTERVAL):
+        self.channel = channel
+        self.guild_id = guild_id
+        self.debounce = debounce
+        self.min_interval = min_interval
+        self.edits = 0
+        self._zones = None
+        self._message = None
+        self._version = 0
+        self._lines = {}
+        self._order = []
+
+    def _rebuild(self, occupancy: Occupancy):
+        self._version, reserved = occupancy.snapshot()
+        self._lines = {zone_name: board_line(zone_name, entry) for zone_name, entry in reserved.items()}
+        self._order = sorted(self._lines)
+
+    def _apply(self, changes: dict) -> bool:
+        changed = False
+        for zone_name, entry in changes.items():
+            line = None if entry is None else board_line(zone_name, entry)
+            previous = self._lines.get(zone_name)
+            if line == previous:
+                continue
+            changed = True
+            if line is None:
+                del self._lines[zone_name]
+                del self._order[bisect_left(self._order, zone_name)]
+            else:
+                if previous is None:
+                    insort(self._order, zone_name)
+                self._lines[zone_name] = line
+        return changed
+
+    async def _find_or_post(self, embed):
+        for message in await self.channel.pins():
+            if message.author == self.channel.guild.me and message.embeds and message.embeds[0].title == BOARD_TITLE:
+                return message
+        message = await self.channel.send(embed=embed)
+        try:
+            await message.pin()
+        except discord.HTTPException as e:
+            logger.warning("Cannot pin the live board in #%s: %s", self.channel, e)
+        return message
+
+    def _embed(self):
+        return board_embed((self._lines[zone_name] for zone_name in self._order),
+                           len(self._order), len(self._zones))
+
+    async def run(self):
+        # Imported here, guilds imports this module for GuildState.occupancy
+        from commands.utils import guilds
+
+        loop = asyncio.get_running_loop()
+        wakeup = asyncio.Event()
+        with sql.use_guild(self.guild_id):
+            state = guilds.state()
+        occupancy, self._zones = state.occupancy, state.zones
+        occupancy.subscribe(lambda: loop.call_soon_threadsafe(wakeup.set))
+
+        self._rebuild(occupancy)
+        self._message = await self._find_or_post(self._embed())
+        await self._message.edit(embed=self._embed())
+        last_edit = time.monotonic()
+        while True:
+            await wakeup.wait()
+            await asyncio.sleep(max(self.debounce, self.min_interval - (time.monotonic() - last_edit)))
+            wakeup.clear()
+            diff = occupancy.changes_since(self._version)
+            if diff is None:
+                self._rebuild(occupancy)
+                changed = True
+            else:
+                self._version, changes = diff
+                changed = self._apply(changes)
+            if not changed:
+                continue
+            try:
+                await self._message.edit(embed=self._embed())
+                self.edits += 1
+            except discord.NotFound:
+                self._message = await self._find_or_post(self._embed())
+            except discord.HTTPException as e:
+                logger.error("Live board edit failed in #%s: %s", self.channel, e)
+            last_edit = time.monotonic()
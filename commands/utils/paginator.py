@@ -0,0 +1,101 @@
+import logging
+
+import discord
+
+import commands.utils.bot_default as bf
+from commands.utils import async_db
+from commands.utils import metrics
+import commands.utils.sql as sql
+
+logger = logging.getLogger(__name__)
+
+PAGE_TIMEOUT = 300
+
+
+class Paginator(discord.ui.View):
+    """
+    Button navigation over a keyset-paginated query.
+
+    `fetch_page(cursor)` returns `(rows, next_cursor)` for the page starting
+    after `cursor` (None for the first page) and `render(rows, page)` turns
+    them into an embed. Only the page asked for is fetched; the view just
+    remembers the cursor each visited page started at to go back. The
+    buttons are disabled when a page fails to load and once the view times out.
+    """
+
+    def __init__(self, fetch_page, render, timeout: float = PAGE_TIMEOUT):
+        super().__init__(timeout=timeout)
+        self.fetch_page = fetch_page
+        self.render = render
+        self._starts = [None]
+        self._next = None
+        # Latest interaction on the message, its token outlives the view's timeout
+        self._interaction = None
+
+    @property
+    def page(self) -> int:
+        return len(self._starts)
+
+    async def _load(self, cursor):
+        try:
+            rows, self._next = await async_db.run_read(self.fetch_page, cursor)
+        except Exception as e:
+            logger.info("Error fetching page %s: %s", self.page, e)
+            self._next = None
+            self._disable()
+            return bf.error_generic()
+        self.previous.disabled = self.page == 1
+        self.next.disabled = self._next is None
+        return self.render(rows, self.page)
+
+    def _disable(self):
+        self.previous.disabled = True
+        self.next.disabled = True
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        # Button callbacks run outside the command's task, point the helpers at its guild again
+        sql.current_guild.set(interaction.guild_id)
+        self._interaction = interaction
+        return True
+
+    async def on_timeout(self):
+        self._disable()
+        if self._interaction is None:
+            return
+        try:
+            with metrics.measure("discord.edit_original_response"):
+                await self._interaction.edit_original_response(view=self)
+        except discord.HTTPException as e:
+            logger.info("Error disabling the buttons of an expired page: %s", e)
+
+    async def first_page(self):
+        self._starts = [None]
+        return await self._load(None)
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def previous(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if len(self._starts) > 1:
+            self._starts.pop()
+        embed = await self._load(self._starts[-1])
+        with metrics.measure("discord.edit_message"):
+            await interaction.response.edit_message(embed=embed, view=self)
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def next(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if self._next is not None:
+            self._starts.append(self._next)
+        embed = await self._load(self._starts[-1])
+        with metrics.measure("discord.edit_message"):
+            await interaction.response.edit_message(embed=embed, view=self)
+
+
+async def send_paginated(interaction: discord.Interaction, fetch_page, render):
+    view = Paginator(fetch_page, render)
+    embed = await view.first_page()
+    if view.next.disabled:
+        with metrics.measure("discord.send_message"):
+            await interaction.response.send_message(embed=embed)
+    else:
+        view._interaction = interaction
+        with metrics.measure("discord.send_message"):
+            await interaction.response.send_message(embed=embed, view=view)
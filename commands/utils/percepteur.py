@@ -1,130 +1,381 @@
 from datetime import datetime
 import sqlite3
 import logging
-
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
-
-
+import discord
+
+import commands.utils.color as color
+import commands.utils.bot_default as bf
+import commands.utils.sql as sql
+from commands.utils import metrics
+from commands.utils import async_db
+from commands.utils import guilds
+from commands.utils import render
+from commands.utils import events
+from commands.utils.events import ZoneEvent
+from commands.utils.occupancy import board_embed, board_line
+from commands.utils.zone_index import normalize
+from commands.utils.expiry import scheduler as expiry
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 20
+IMPORT_CHUNK_SIZE = 500
+COMPACT_BATCH_SIZE = 5000
+
+# Reservation outcomes
+RESERVED = "reserved"
+FREED = "freed"
+CONFLICT = "conflict"
+UNKNOWN = "unknown"
+
+
+@metrics.timed()
 def register_zone(zone_name: str, user: str, is_locked: bool = False):
-    connection_obj = sqlite3.connect('lbg.db')
+    connection_obj = sql.get_pool().acquire()
     cursor_obj = connection_obj.cursor()
-    cursor_obj.execute("PRAGMA foreign_keys = ON;")
     current_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
     try:
+        # Names differing only by case or accents are the same zone
+        key = normalize(zone_name)
         cursor_obj.execute(
-            "INSERT INTO ZONES (ZONE, IsLocked, Date, CreatedBy) VALUES (?, ?, ?, ?);",
-            (zone_name, int(is_locked), current_date, user)
+            "INSERT INTO ZONES (ZONE, ZoneKey, IsLocked, Date, CreatedBy) SELECT ?, ?, ?, ?, ? "
+            "WHERE NOT EXISTS (SELECT 1 FROM ZONES WHERE ZoneKey = ?);",
+            (zone_name, key, int(is_locked), current_date, user, key)
         )
         connection_obj.commit()
-        logging.info(f"Zone '{zone_name}' registered successfully.")
+        if cursor_obj.rowcount == 0:
+            logger.info("Zone '%s' already registered as '%s'.", zone_name, guilds.state().zones.resolve(zone_name))
+            return
+        guilds.state().zones.add(zone_name)
+        events.emit(ZoneEvent(events.ZONE_ADD, zone_name, user))
+        logger.info("Zone '%s' registered successfully.", zone_name)
     except sqlite3.IntegrityError as e:
-        logging.info(f"Error registering zone '{zone_name}': {e}")
+        logger.info("Error registering zone '%s': %s", zone_name, e)
     finally:
-        connection_obj.close()
+        sql.get_pool().release(connection_obj)
 
 
 # Helper: Delete Zone
+@metrics.timed()
 def delete_zone(zone_name: str):
-    connection_obj = sqlite3.connect('lbg.db')
-    cursor_obj = connection_obj.cursor()
-    cursor_obj.execute("PRAGMA foreign_keys = ON;")
+    write_behind = guilds.state().write_behind
+    if write_behind:
+        deleted = write_behind.delete_zone(zone_name, lambda: _delete_zone(zone_name))
+    else:
+        deleted = _delete_zone(zone_name)
+    if deleted:
+        guilds.state().zones.remove(zone_name)
+        guilds.state().occupancy.freed(zone_name)
+        expiry.cancel(zone_name)
+        events.emit(ZoneEvent(events.ZONE_DELETE, zone_name, None))
+        logger.info("Zone '%s' deleted successfully.", zone_name)
+    else:
+        logger.info("Zone '%s' not found.", zone_name)
+    return deleted
+
 
+def _delete_zone(zone_name: str) -> bool:
+    connection_obj = sql.get_pool().acquire()
     try:
-        cursor_obj.execute("DELETE FROM ZONES WHERE ZONE = ?;", (zone_name,))
-        changes = connection_obj.total_changes
+        changes = connection_obj.execute("DELETE FROM ZONES WHERE ZONE = ?;", (zone_name,)).rowcount
         connection_obj.commit()
-        if changes > 0:
-            logging.info(f"Zone '{zone_name}' deleted successfully.")
-            return True
-        else:
-            logging.info(f"Zone '{zone_name}' not found.")
-            return False
+        return changes > 0
     finally:
-        connection_obj.close()
+        sql.get_pool().release(connection_obj)
 
 
-def reserve_zone(zone_name: str, user: str):
-    connection_obj = sqlite3.connect('lbg.db')
+@metrics.timed()
+def add_zone_alias(alias: str, zone_name: str, user: str):
+    """
+    Let `alias` stand for `zone_name` in the /percepteur commands.
+    """
+    if not zone_name:
+        return unknown_zone(zone_name)
+    zone_name = resolve_zone(zone_name)
+    key = normalize(alias or '')
+    if not key or guilds.state().zones.resolve(zone_name) is None:
+        return unknown_zone(zone_name)
+    if key in guilds.state().zones:
+        return discord.Embed(title=f"Alias déjà utilisé par une zone", description=alias, color=color.YELLOW)
+
+    connection_obj = sql.get_pool().acquire()
+    try:
+        connection_obj.execute(
+            "INSERT INTO ZoneAlias (Alias, ZONE, CreatedBy) VALUES (?, ?, ?) "
+            "ON CONFLICT (Alias) DO UPDATE SET ZONE = excluded.ZONE, CreatedBy = excluded.CreatedBy;",
+            (key, zone_name, user)
+        )
+        connection_obj.commit()
+        guilds.state().zones.add_alias(key, zone_name)
+        logger.info("Alias '%s' of zone '%s' added by %s.", alias, zone_name, user)
+        return discord.Embed(title=f"Alias enregistré", description=f"{alias} → {zone_name}", color=color.GREEN)
+    except sqlite3.Error as e:
+        logger.error("Error adding alias '%s' of zone '%s': %s", alias, zone_name, e)
+        return bf.error_generic()
+    finally:
+        sql.get_pool().release(connection_obj)
+
+
+@metrics.timed()
+def try_reserve(zone_name: str, user: str):
+    """
+    Compare-and-set reservation: flips ZONES.IsLocked from 0 to 1 and records
+    the holder in Lock inside one IMMEDIATE transaction, so two concurrent
+    calls can never both win. Lock keeps a single row with Released NULL per
+    reserved zone, released rows wait there for compact_lock_history.
+    :return: (RESERVED | CONFLICT | UNKNOWN, holder pseudo)
+    """
+    connection_obj = sql.get_pool().acquire()
     cursor_obj = connection_obj.cursor()
-    cursor_obj.execute("PRAGMA foreign_keys = ON;")
     current_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
     try:
-        # Insert into Lock table
+        cursor_obj.execute("BEGIN IMMEDIATE;")
+        cursor_obj.execute("UPDATE ZONES SET IsLocked = 1 WHERE ZONE = ? AND IsLocked = 0;", (zone_name,))
+        if cursor_obj.rowcount == 1:
+            cursor_obj.execute("UPDATE Lock SET Released = ? WHERE ZONE = ? AND Released IS NULL;",
+                               (current_date, zone_name))
+            cursor_obj.execute(
+                "INSERT INTO Lock (ZONE, Pseudo, Date, CreatedBy) VALUES (?, ?, ?, ?);",
+                (zone_name, user, current_date, user)
+            )
+            connection_obj.commit()
+            return RESERVED, user
+
         cursor_obj.execute(
-            "INSERT INTO Lock (ZONE, Pseudo, Date, CreatedBy) VALUES (?, ?, ?, ?);",
-            (zone_name, user, current_date, user)
+            "SELECT Lock.Pseudo FROM ZONES LEFT JOIN Lock ON Lock.ZONE = ZONES.ZONE AND Lock.Released IS NULL "
+            "WHERE ZONES.ZONE = ?;",
+            (zone_name,)
         )
+        row = cursor_obj.fetchone()
+        connection_obj.rollback()
+        if row is None:
+            return UNKNOWN, None
+        return CONFLICT, row[0]
+    finally:
+        sql.get_pool().release(connection_obj)
+
+
+@metrics.timed()
+def try_unreserve(zone_name: str, user: str):
+    """
+    Compare-and-set release: only the current holder can unreserve a zone.
+    :return: (FREED | CONFLICT | UNKNOWN, holder pseudo)
+    """
+    connection_obj = sql.get_pool().acquire()
+    cursor_obj = connection_obj.cursor()
+    current_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    try:
+        cursor_obj.execute("BEGIN IMMEDIATE;")
+        cursor_obj.execute("UPDATE Lock SET Released = ? WHERE ZONE = ? AND Pseudo = ? AND Released IS NULL;",
+                           (current_date, zone_name, user))
+        if cursor_obj.rowcount > 0:
+            cursor_obj.execute("UPDATE ZONES SET IsLocked = 0 WHERE ZONE = ?;", (zone_name,))
+            connection_obj.commit()
+            return FREED, None
 
-        # Update the IsLocked field in ZONES table
         cursor_obj.execute(
-            "UPDATE ZONES SET IsLocked = 1 WHERE ZONE = ?;",
+            "SELECT ZONES.IsLocked, Lock.Pseudo FROM ZONES "
+            "LEFT JOIN Lock ON Lock.ZONE = ZONES.ZONE AND Lock.Released IS NULL WHERE ZONES.ZONE = ?;",
             (zone_name,)
         )
+        row = cursor_obj.fetchone()
+        connection_obj.rollback()
+        if row is None:
+            return UNKNOWN, None
+        if not row[0]:
+            return FREED, None
+        return CONFLICT, row[1]
+    finally:
+        sql.get_pool().release(connection_obj)
 
-        connection_obj.commit()
-        logging.info(f"Zone '{zone_name}' reserved successfully.")
-    except sqlite3.IntegrityError as e:
-        logging.info(f"Error reserving zone '{zone_name}': {e}")
+
+def resolve_zone(zone_name: str) -> str:
+    """
+    Stored name of the zone typed as `zone_name` (any case or accents, or an alias), unchanged when unknown.
+    """
+    return zone_name and guilds.state().zones.resolve(zone_name) or zone_name
+
+
+def unknown_zone(zone_name: str):
+    embed = discord.Embed(title=f"Zone inconnue", description=zone_name, color=color.YELLOW)
+    suggestions = guilds.state().zones.suggest(zone_name) if zone_name else []
+    if suggestions:
+        embed.add_field(name="Vouliez-vous dire", value="\n".join(suggestions), inline=False)
+    return embed
+
+
+def reserve_zone(zone_name: str, user: str):
+    embed = bf.error_generic()
+    write_behind = guilds.state().write_behind
+    zone_name = resolve_zone(zone_name)
+
+    try:
+        status, holder = (write_behind.try_reserve if write_behind else try_reserve)(zone_name, user)
+        if status == RESERVED:
+            expiry.schedule(zone_name, user)
+            guilds.state().occupancy.reserved(zone_name, user)
+            events.emit(ZoneEvent(events.RESERVE, zone_name, user))
+            logger.info("Zone '%s' reserved successfully by %s.", zone_name, user)
+            embed = discord.Embed(title=f"Zone réservée", description=zone_name, color=color.GREEN)
+        elif status == CONFLICT:
+            logger.info("Zone '%s' already reserved by %s, %s refused.", zone_name, holder, user)
+            embed = discord.Embed(title=f"Zone déjà réservée", color=color.YELLOW,
+                                  description=f"{zone_name} est réservée par {holder}")
+        else:
+            logger.info("Zone '%s' not found.", zone_name)
+            embed = unknown_zone(zone_name)
+    except sqlite3.Error as e:
+        logger.info("Error reserving zone '%s': %s", zone_name, e)
     finally:
-        connection_obj.close()
+        return embed
 
 
 def unreserve_zone(zone_name: str, user: str):
-    connection_obj = sqlite3.connect('lbg.db')
+    embed = bf.error_generic()
+    write_behind = guilds.state().write_behind
+    zone_name = resolve_zone(zone_name)
+
+    try:
+        status, holder = (write_behind.try_unreserve if write_behind else try_unreserve)(zone_name, user)
+        if status == FREED:
+            expiry.cancel(zone_name)
+            guilds.state().occupancy.freed(zone_name)
+            events.emit(ZoneEvent(events.UNRESERVE, zone_name, user))
+            logger.info("Zone '%s' unreserved successfully by %s.", zone_name, user)
+            embed = discord.Embed(title=f"Zone libérée", description=zone_name, color=color.GREEN)
+        elif status == CONFLICT:
+            logger.info("Zone '%s' is reserved by %s, %s cannot unreserve it.", zone_name, holder, user)
+            embed = discord.Embed(title=f"Zone réservée par un autre membre", color=color.YELLOW,
+                                  description=f"{zone_name} est réservée par {holder}")
+        else:
+            logger.info("Zone '%s' not found.", zone_name)
+            embed = unknown_zone(zone_name)
+    except sqlite3.Error as e:
+        logger.info("Error unreserving zone '%s': %s", zone_name, e)
+    finally:
+        return embed
+
+
+# Helper: Free Zone
+@metrics.timed()
+def free_zone(zone_name: str):
+    write_behind = guilds.state().write_behind
+    if write_behind:
+        write_behind.free(zone_name)
+        _freed(zone_name)
+        return
+
+    connection_obj = sql.get_pool().acquire()
     cursor_obj = connection_obj.cursor()
-    cursor_obj.execute("PRAGMA foreign_keys = ON;")
     current_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
     try:
+        # Release the current reservation, the row moves to LockArchive on the next compaction
         cursor_obj.execute(
-            "INSERT INTO Lock (ZONE, Pseudo, Date, CreatedBy) VALUES (?, ?, ?, ?);",
-            (zone_name, user, current_date, user)
+            "UPDATE Lock SET Released = ? WHERE ZONE = ? AND Released IS NULL;",
+            (current_date, zone_name)
         )
 
+        # Update the IsLocked field in ZONES table
         cursor_obj.execute(
             "UPDATE ZONES SET IsLocked = 0 WHERE ZONE = ?;",
             (zone_name,)
         )
 
         connection_obj.commit()
-        logging.info(f"Zone '{zone_name}' unreserved successfully.")
+        _freed(zone_name)
+        logger.info("Zone '%s' freed successfully.", zone_name)
     except sqlite3.IntegrityError as e:
-        logging.info(f"Error unreserving zone '{zone_name}': {e}")
+        logger.info("Error freeing zone '%s': %s", zone_name, e)
     finally:
-        connection_obj.close()
+        sql.get_pool().release(connection_obj)
 
 
-# Helper: Free Zone
-def free_zone(zone_name: str):
-    connection_obj = sqlite3.connect('lbg.db')
+def _freed(zone_name: str):
+    expiry.cancel(zone_name)
+    guilds.state().occupancy.freed(zone_name)
+    events.emit(ZoneEvent(events.FREE, zone_name, None))
+
+
+@metrics.timed()
+def free_expired(reservations: list) -> list:
+    """
+    Free in one transaction every (zone, pseudo) reservation still held by
+    that pseudo, and return the freed ones.
+    """
+    write_behind = guilds.state().write_behind
+    if write_behind:
+        freed = [(zone_name, user) for zone_name, user in reservations if write_behind.free(zone_name, user)]
+        _expired(freed)
+        return freed
+
+    connection_obj = sql.get_pool().acquire()
     cursor_obj = connection_obj.cursor()
-    cursor_obj.execute("PRAGMA foreign_keys = ON;")
+    current_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    freed = []
+
+    try:
+        cursor_obj.execute("BEGIN IMMEDIATE;")
+        for zone_name, user in reservations:
+            cursor_obj.execute(
+                "UPDATE Lock SET Released = ? WHERE ZONE = ? AND Pseudo = ? AND Released IS NULL;",
+                (current_date, zone_name, user)
+            )
+            if cursor_obj.rowcount:
+                cursor_obj.execute("UPDATE ZONES SET IsLocked = 0 WHERE ZONE = ?;", (zone_name,))
+                freed.append((zone_name, user))
+        connection_obj.commit()
+        _expired(freed)
+        return freed
+    finally:
+        sql.get_pool().release(connection_obj)
+
+
+def _expired(freed: list):
+    guilds.state().occupancy.freed(*(zone_name for zone_name, _ in freed))
+    for zone_name, user in freed:
+        events.emit(ZoneEvent(events.EXPIRE, zone_name, user))
+
 
+@metrics.timed()
+def compact_lock_history(batch_size: int = COMPACT_BATCH_SIZE):
+    """
+    Move the oldest batch of released Lock rows to LockArchive in a single transaction.
+    :return: Number of rows moved, 0 once the hot table only holds current reservations.
+    """
+    connection_obj = sql.get_pool().acquire()
+    cursor_obj = connection_obj.cursor()
     try:
-        # Delete from Lock table
+        cursor_obj.execute("BEGIN IMMEDIATE;")
         cursor_obj.execute(
-            "DELETE FROM Lock WHERE ZONE = ?;",
-            (zone_name,)
+            "SELECT MIN(ID), MAX(ID), COUNT(*) FROM "
+            "(SELECT ID FROM Lock WHERE Released IS NOT NULL ORDER BY ID LIMIT ?);",
+            (batch_size,)
         )
+        first_id, last_id, count = cursor_obj.fetchone()
+        if not count:
+            connection_obj.rollback()
+            return 0
 
-        # Update the IsLocked field in ZONES table
         cursor_obj.execute(
-            "UPDATE ZONES SET IsLocked = 0 WHERE ZONE = ?;",
-            (zone_name,)
+            "INSERT OR IGNORE INTO LockArchive (ID, ZONE, Pseudo, Date, CreatedBy, Released) "
+            "SELECT ID, ZONE, Pseudo, Date, CreatedBy, Released FROM Lock "
+            "WHERE ID BETWEEN ? AND ? AND Released IS NOT NULL;",
+            (first_id, last_id)
         )
-
+        cursor_obj.execute("DELETE FROM Lock WHERE ID BETWEEN ? AND ? AND Released IS NOT NULL;", (first_id, last_id))
         connection_obj.commit()
-        logging.info(f"Zone '{zone_name}' freed successfully.")
-    except sqlite3.IntegrityError as e:
-        logging.info(f"Error freeing zone '{zone_name}': {e}")
+        return count
     finally:
-        connection_obj.close()
+        sql.get_pool().release(connection_obj)
 
 
+@metrics.timed()
 def list_zone(zone: str):
-    connection_obj = sqlite3.connect('lbg.db')
+    connection_obj = sql.get_pool().acquire()
     cursor_obj = connection_obj.cursor()
     try:
         cursor_obj.execute("SELECT * FROM ZONES WHERE ZONE = ?;", (zone,))
@@ -132,22 +383,95 @@ def list_zone(zone: str):
         return rows
 
     finally:
-        connection_obj.close()
+        sql.get_pool().release(connection_obj)
 
 
+@metrics.timed()
 def list_all_zone():
-    connection_obj = sqlite3.connect('lbg.db')
+    connection_obj = sql.get_pool().acquire()
     cursor_obj = connection_obj.cursor()
     try:
         cursor_obj.execute("SELECT * FROM ZONES;")
         zones = cursor_obj.fetchall()
         return zones
     finally:
-        connection_obj.close()
+        sql.get_pool().release(connection_obj)
 
 
+@metrics.timed()
+def zones_page(after: str = None):
+    """
+    One keyset page of ZONES ordered by name.
+    :param after: Last zone name of the previous page, None for the first page.
+    :return: The page rows and the cursor of the next page (None on the last one).
+    """
+    connection_obj = sql.get_pool().acquire()
+    cursor_obj = connection_obj.cursor()
+    try:
+        cursor_obj.execute(
+            "SELECT ZONE, IsLocked, Date, CreatedBy FROM ZONES WHERE ZONE > ? ORDER BY ZONE LIMIT ?;",
+            ('' if after is None else after, PAGE_SIZE + 1)
+        )
+        # Tuples so the rows can key the render cache
+        rows = tuple(cursor_obj.fetchall())
+        if len(rows) > PAGE_SIZE:
+            return rows[:PAGE_SIZE], rows[PAGE_SIZE - 1][0]
+        return rows, None
+    finally:
+        sql.get_pool().release(connection_obj)
+
+
+def iter_zone_pages():
+    """
+    Walk the whole ZONES table one page at a time without loading it in memory.
+    """
+    after = None
+    while True:
+        rows, after = zones_page(after)
+        if rows:
+            yield rows
+        if after is None:
+            return
+
+
+@render.cached()
+def render_zones(rows: tuple, page: int = 1):
+    if not rows:
+        return discord.Embed(title="Aucune zone enregistrée", color=color.YELLOW)
+    embed = discord.Embed(title="Zones", color=color.BLUE)
+    for zone, is_locked, date, created_by in rows:
+        embed.add_field(name=zone, value="Réservée" if is_locked else "Libre", inline=False)
+    embed.set_footer(text=f"Page {page}")
+    return embed
+
+
+def render_expired(freed: list):
+    """
+    One embed for a whole expiry batch, listing as many zones as fit.
+    """
+    description = render.truncate_lines((f"{zone_name} ({user})" for zone_name, user in freed), len(freed))
+    return discord.Embed(title=f"{len(freed)} réservations expirées", description=description, color=color.YELLOW)
+
+
+@metrics.timed()
+def board():
+    """
+    Every current reservation, rendered from the in-memory occupancy.
+    """
+    state = guilds.state()
+    return _render_board(state.occupancy, state.occupancy.version, len(state.zones))
+
+
+@render.cached(size=16)
+def _render_board(occupancy, version: int, total: int):
+    _, reserved = occupancy.snapshot()
+    lines = (board_line(zone_name, reserved[zone_name]) for zone_name in sorted(reserved))
+    return board_embed(lines, len(reserved), total)
+
+
+@metrics.timed()
 def get_zones_like(search_string: str):
-    connection_obj = sqlite3.connect('lbg.db')
+    connection_obj = sql.get_pool().acquire()
     cursor_obj = connection_obj.cursor()
     try:
         # Use parameterized query to avoid SQL injection
@@ -159,46 +483,92 @@ def get_zones_like(search_string: str):
 
         return zones
     finally:
-        connection_obj.close()
+        sql.get_pool().release(connection_obj)
 
 
+@metrics.timed()
+def search_zones(search_string: str):
+    """
+    Autocomplete lookup served from the in-memory zone index, case and accent insensitive.
+    :param search_string: What the user typed so far.
+    """
+    return guilds.state().zones.search(search_string)
 
+
+@metrics.timed()
 def bulk_register_zone(zones: list[tuple]):
     """
-    Inserts multiple zone records into the database in a single bulk operation.
-    :param zones: List of tuples containing zone data.
+    Inserts multiple zone records into the database in a single transaction.
+    Zones already present, under any case or accents, are skipped instead of
+    aborting the whole batch.
+    :param zones: List of (ZONE, IsLocked, Date, CreatedBy) tuples.
+    :return: Number of zones actually inserted.
     """
-    connection_obj = sqlite3.connect('lbg.db')
+    connection_obj = sql.get_pool().acquire()
     cursor_obj = connection_obj.cursor()
-    cursor_obj.execute("PRAGMA foreign_keys = ON;")
+    inserted = 0
 
     try:
         # Perform bulk insert
         cursor_obj.executemany(
-            "INSERT INTO ZONES (ZONE, IsLocked, Date, CreatedBy) VALUES (?, ?, ?, ?);",
-            zones
+            "INSERT OR IGNORE INTO ZONES (ZONE, ZoneKey, IsLocked, Date, CreatedBy) SELECT ?, ?, ?, ?, ? "
+            "WHERE NOT EXISTS (SELECT 1 FROM ZONES WHERE ZoneKey = ?);",
+            [(zone[0], key, *zone[1:], key) for zone, key in ((zone, normalize(zone[0])) for zone in zones)]
         )
+        inserted = cursor_obj.rowcount
         connection_obj.commit()
-        logging.info(f"{len(zones)} zones registered successfully.")
-    except sqlite3.IntegrityError as e:
-        logging.error(f"Error during bulk zone registration: {e}")
+        guilds.state().zones.add(*[zone[0] for zone in zones])
+        logger.info("%s/%s zones registered successfully.", inserted, len(zones))
+    except sqlite3.Error as e:
+        logger.error("Error during bulk zone registration: %s", e)
     finally:
-        connection_obj.close()
+        sql.get_pool().release(connection_obj)
+        return inserted
 
 
-def bulk_zone_from_forum(channel):
+async def iter_forum_threads(channel):
     """
-    Gathers zone data from a forum channel and performs a bulk insert into the database.
-    :param channel: The forum channel containing threads to register as zones.
+    Stream the active then archived threads of a forum channel. Archived
+    threads are fetched from the API page by page by discord.py.
     """
-    zones = []
-    current_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    for thread in await channel.guild.active_threads():
+        if thread.parent_id == channel.id:
+            yield thread
+    async for thread in channel.archived_threads(limit=None):
+        yield thread
 
-    # Collect zone data from threads
-    for thread in channel.threads:
-        zones.append((thread.name, 0, current_date, 'BOT'))
 
-    if zones:
-        bulk_register_zone(zones)
-    else:
-        logging.info("No threads found in the forum channel to register.")
+@metrics.timed()
+async def bulk_zone_from_forum(channel, progress=None):
+    """
+    Gathers zone data from a forum channel and inserts the new ones in chunks.
+    :param channel: The forum channel containing threads to register as zones.
+    :param progress: Optional coroutine function called with (seen, inserted) after each chunk.
+    :return: (threads seen, zones inserted)
+    """
+    current_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    seen, inserted = 0, 0
+    names = set()
+    chunk = []
+
+    async def flush():
+        nonlocal inserted, chunk
+        inserted += await async_db.run_write(bulk_register_zone, chunk)
+        chunk = []
+        if progress is not None:
+            await progress(seen, inserted)
+
+    async for thread in iter_forum_threads(channel):
+        seen += 1
+        if thread.name in names or thread.name in guilds.state().zones:
+            continue
+        names.add(thread.name)
+        chunk.append((thread.name, 0, current_date, 'BOT'))
+        if len(chunk) >= IMPORT_CHUNK_SIZE:
+            await flush()
+
+    if chunk:
+        await flush()
+    if not seen:
+        logger.info("No threads found in the forum channel to register.")
+    return seen, inserted
@@ -0,0 +1,112 @@
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_SIZE = 512
+
+
+class QueryCache:
+    """
+    Read-through LRU cache for SELECT results.
+
+    Entries are tagged when stored so writers can drop exactly the results
+    they affect (e.g. every (metier, level) entry of one metier). A generation
+    counter bumped on each invalidation keeps a read that raced with a write
+    from storing its stale rows.
+    """
+
+    def __init__(self, name: str, size: int = DEFAULT_SIZE):
+        self.name = name
+        self.size = size
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._tags = {}
+        self._key_tags = {}
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.load_time = 0.0
+
+    def get_or_load(self, key, tag, loader, *args):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            generation = self._generation
+
+        start = time.perf_counter()
+        value = loader(*args)
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self.load_time += elapsed
+            if generation == self._generation:
+                self._store(key, tag, value)
+        return value
+
+    def _store(self, key, tag, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        self._tags.setdefault(tag, set()).add(key)
+        self._key_tags[key] = tag
+        while len(self._entries) > self.size:
+            old_key, _ = self._entries.popitem(last=False)
+            self._untag(old_key)
+            self.evictions += 1
+
+    def _untag(self, key):
+        tag = self._key_tags.pop(key)
+        keys = self._tags[tag]
+        keys.discard(key)
+        if not keys:
+            del self._tags[tag]
+
+    def invalidate(self, tag):
+        with self._lock:
+            self._generation += 1
+            for key in self._tags.pop(tag, ()):
+                del self._entries[key]
+                del self._key_tags[key]
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._tags.clear()
+            self._key_tags.clear()
+
+    def dump(self) -> list:
+        """
+        (key, tag, value) of every entry, least recently used first.
+        """
+        with self._lock:
+            return [(key, self._key_tags[key], value) for key, value in self._entries.items()]
+
+    def restore(self, entries):
+        """
+        Refill from `dump` output, dropping whatever is cached.
+        """
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._tags.clear()
+            self._key_tags.clear()
+            for key, tag, value in entries:
+                self._store(key, tag, value)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "avg_miss_ms": self.load_time / self.misses * 1000 if self.misses else 0.0,
+        }
@@ -0,0 +1,61 @@
+import functools
+
+from commands.utils import metrics
+
+RENDER_CACHE_SIZE = 256
+EMBED_DESCRIPTION_LIMIT = 4096
+# Room kept for the "… et N autres" line
+TRUNCATION_MARGIN = 40
+
+_caches = {}
+
+
+def static(func):
+    """
+    Build the embed returned by the zero-argument `func` once and hand out the
+    same instance afterwards. Callers must not mutate it.
+    """
+    return functools.cache(func)
+
+
+def truncate_lines(lines, count: int, limit: int = EMBED_DESCRIPTION_LIMIT) -> str:
+    """
+    Join as many of the `count` `lines` as fit in `limit` characters, the
+    rest summed up as "… et N autres". `lines` may be any iterable.
+    """
+    description = ""
+    for shown, line in enumerate(lines):
+        if len(description) + len(line) + TRUNCATION_MARGIN > limit:
+            return description + f"… et {count - shown} autres"
+        description += line + "\n"
+    return description
+
+
+def cached(size: int = RENDER_CACHE_SIZE):
+    """
+    LRU of rendered embeds keyed by the render arguments, i.e. the query
+    result itself (rows as tuples) or a version of the data it was built
+    from. A changed result is a new key, so nothing needs invalidating.
+    Only misses are timed, as `render.<function>`. Callers must not mutate
+    the returned embed.
+    """
+    def decorator(func):
+        name = f"render.{func.__name__}"
+        wrapper = functools.lru_cache(maxsize=size)(metrics.timed(name)(func))
+        _caches[name] = wrapper
+        return wrapper
+    return decorator
+
+
+def stats() -> dict:
+    result = {}
+    for name, cache in sorted(_caches.items()):
+        info = cache.cache_info()
+        lookups = info.hits + info.misses
+        result[name] = {
+            "entries": info.currsize,
+            "hits": info.hits,
+            "misses": info.misses,
+            "hit_rate": info.hits / lookups if lookups else 0.0,
+        }
+    return result
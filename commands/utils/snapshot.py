@@ -0,0 +1,78 @@
+import logging
+import os
+import pickle
+
+import commands.utils.sql as sql
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_PATH = 'lbg.snapshot'
+# Bump when the content below changes, files of another format are ignored
+SNAPSHOT_FORMAT = 3
+
+# Snapshot of the primary guild, the others use partition_path of it. None turns snapshots off.
+path = None
+
+
+def save(state) -> bool:
+    """
+    Write the warm in-memory data of `state`, the current guild's, tagged with
+    the DataVersion it matches: the built zone and artisan indexes, the
+    coverage matrix and the cached artisan pages. The tables are pickled as
+    they are, so no write may run meanwhile (see lifecycle.shutdown). The
+    file is replaced atomically, a crash while writing leaves the previous one.
+    """
+    if path is None:
+        return False
+    target = sql.partition_path(path)
+    data = {
+        "format": SNAPSHOT_FORMAT,
+        "data_version": sql.data_version(),
+        "zones": state.zones.dump(),
+        "artisans": state.artisans.dump(),
+        "coverage": state.coverage.dump(),
+        "artisans_cache": state.artisans_cache.dump(),
+    }
+    with open(target + ".tmp", "wb") as stream:
+        pickle.dump(data, stream, pickle.HIGHEST_PROTOCOL)
+        stream.flush()
+        os.fsync(stream.fileno())
+    os.replace(target + ".tmp", target)
+    logger.info("Snapshot '%s' written at data version %s", target, data["data_version"])
+    return True
+
+
+def restore(state) -> bool:
+    """
+    Fill `state` from the current guild's snapshot when it was written at the
+    current DataVersion. Returns False, leaving `state` untouched, when the
+    file is missing, stale or unreadable: the caller loads from the database.
+    """
+    if path is None:
+        return False
+    target = sql.partition_path(path)
+    try:
+        with open(target, "rb") as stream:
+            data = pickle.load(stream)
+    except FileNotFoundError:
+        return False
+    except Exception as e:
+        # A damaged snapshot only costs the warm start, never the boot
+        logger.warning("Snapshot '%s' unreadable, ignored: %s", target, e)
+        return False
+    if not isinstance(data, dict) or data.get("format") != SNAPSHOT_FORMAT:
+        logger.info("Snapshot '%s' has another format, ignored", target)
+        return False
+    version = sql.data_version()
+    if data.get("data_version") != version:
+        logger.info("Snapshot '%s' is stale (data version %s, database at %s), ignored",
+                    target, data.get("data_version"), version)
+        return False
+
+    state.zones.restore(data["zones"])
+    state.coverage.restore(data["coverage"])
+    if data["artisans"] is not None:
+        state.artisans.restore(data["artisans"])
+    state.artisans_cache.restore(data["artisans_cache"])
+    logger.info("Snapshot '%s' restored at data version %s", target, version)
+    return True
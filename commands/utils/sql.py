@@ -1,13 +1,230 @@
+import logging
+import os
+import queue
 import sqlite3
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
 
+logger = logging.getLogger(__name__)
 
-def run_init_sql():
-    connection_obj = sqlite3.connect('lbg.db')
-    cursor_obj = connection_obj.cursor()
+DB_PATH = 'lbg.db'
+POOL_SIZE = 5
+POOL_TIMEOUT = 10
+STATEMENT_CACHE_SIZE = 256
+
+PRAGMAS = [
+    "PRAGMA journal_mode = WAL;",
+    "PRAGMA synchronous = NORMAL;",
+    "PRAGMA foreign_keys = ON;",
+    "PRAGMA temp_store = MEMORY;",
+    "PRAGMA cache_size = -8000;",
+    "PRAGMA busy_timeout = 5000;",
+]
+
+
+class ConnectionPool:
+    """
+    Bounded pool of sqlite connections sharing the same tuned pragmas.
+
+    Connections are opened lazily up to `size` and handed back to the pool on
+    release, so the pragmas and the per-connection prepared statement cache
+    survive between commands.
+    """
+
+    def __init__(self, path: str = DB_PATH, size: int = POOL_SIZE, timeout: float = POOL_TIMEOUT):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._opened = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _connect(self):
+        connection_obj = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False,
+                                         cached_statements=STATEMENT_CACHE_SIZE)
+        for pragma in PRAGMAS:
+            connection_obj.execute(pragma)
+        return connection_obj
+
+    def acquire(self):
+        if self._closed:
+            raise sqlite3.ProgrammingError("Connection pool is closed")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._opened < self.size:
+                self._opened += 1
+                try:
+                    return self._connect()
+                except sqlite3.Error:
+                    self._opened -= 1
+                    raise
+
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError(f"No database connection available after {self.timeout}s")
+
+    def release(self, connection_obj):
+        if connection_obj.in_transaction:
+            connection_obj.rollback()
+        if self._closed:
+            connection_obj.close()
+            return
+        self._idle.put_nowait(connection_obj)
+
+    @contextmanager
+    def connection(self):
+        connection_obj = self.acquire()
+        try:
+            yield connection_obj
+        except Exception:
+            if connection_obj.in_transaction:
+                connection_obj.rollback()
+            raise
+        finally:
+            self.release(connection_obj)
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+_pool = None
+_pool_lock = threading.RLock()
+
+# Guild the helpers work on, set per interaction by the command tree. None and
+# the primary guild use DB_PATH, every other guild gets its own database file.
+current_guild = ContextVar('current_guild', default=None)
+_primary_guild = None
+_guild_pools = {}
+
+
+def set_primary_guild(guild_id: int):
+    global _primary_guild
+    _primary_guild = guild_id
+
+
+def guild_key(guild_id: int = None):
+    """
+    Partition of `guild_id` (default: the current guild), None for the primary one.
+    """
+    if guild_id is None:
+        guild_id = current_guild.get()
+    return None if guild_id == _primary_guild else guild_id
+
+
+def guild_id(key: int = None) -> int:
+    """
+    Discord id of the guild of partition `key` (default: the current guild),
+    the primary guild's id in place of None.
+    """
+    if key is None:
+        key = current_guild.get()
+    return _primary_guild if key is None else key
+
+
+def partition_path(path: str, guild_id: int = None) -> str:
+    """
+    `path` for the primary guild, `<stem>-<guild_id><ext>` for the others.
+    """
+    key = guild_key(guild_id)
+    if key is None:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}-{key}{ext}"
+
+
+@contextmanager
+def use_guild(guild_id: int):
+    token = current_guild.set(guild_id)
+    try:
+        yield
+    finally:
+        current_guild.reset(token)
+
+
+def _default_pool() -> ConnectionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+    return _pool
+
+
+def get_pool() -> ConnectionPool:
+    """
+    Pool of the current guild's database. A guild seen for the first time gets
+    its database file created and migrated before anyone can use it.
+    """
+    key = guild_key()
+    if key is None:
+        return _default_pool()
+    pool = _guild_pools.get(key)
+    if pool is None:
+        with _pool_lock:
+            pool = _guild_pools.get(key)
+            if pool is None:
+                default = _default_pool()
+                pool = ConnectionPool(partition_path(default.path, key), default.size, default.timeout)
+                migrate(pool)
+                _guild_pools[key] = pool
+                logger.info("Database pool ready on '%s' for guild %s", pool.path, key)
+    return pool
+
+
+def guild_pools() -> dict:
+    """
+    Opened pools by partition, None being the primary guild.
+    """
+    with _pool_lock:
+        return {None: _default_pool(), **_guild_pools}
+
+
+def configure_pool(path: str = DB_PATH, size: int = POOL_SIZE, timeout: float = POOL_TIMEOUT) -> ConnectionPool:
+    """
+    Replace the shared pool, closing the previous one and the per-guild pools
+    derived from it. Used at startup and by scripts pointing the helpers at
+    another database file.
+    """
+    global _pool
+    with _pool_lock:
+        for pool in [_pool, *_guild_pools.values()]:
+            if pool is not None:
+                pool.close()
+        _guild_pools.clear()
+        _pool = ConnectionPool(path, size, timeout)
+        logger.info("Database pool ready on '%s' (%s connections max)", path, size)
+    return _pool
+
+
+def get_connection():
+    return get_pool().connection()
+
+
+def _fill_zone_keys(connection_obj):
+    # Imported here, zone_index imports this module
+    from commands.utils.zone_index import normalize
 
-    cursor_obj.execute("PRAGMA foreign_keys = ON;")
+    rows = connection_obj.execute("SELECT ID, ZONE FROM ZONES;").fetchall()
+    connection_obj.executemany("UPDATE ZONES SET ZoneKey = ? WHERE ID = ?;",
+                               [(normalize(zone_name), row_id) for row_id, zone_name in rows])
 
-    tables = [
+
+# Ordered schema steps: (version, description, statements). Never edit a
+# shipped step, append a new one instead.
+MIGRATIONS = [
+    (1, "initial tables", [
         """
         CREATE TABLE IF NOT EXISTS METIERS (
             ID INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -38,11 +255,167 @@ def run_init_sql():
             CreatedBy TEXT,
             FOREIGN KEY (ZONE) REFERENCES ZONES (ZONE) ON DELETE CASCADE ON UPDATE CASCADE
         );
+        """,
+    ]),
+    (2, "lookup indexes", [
+        "CREATE INDEX IF NOT EXISTS idx_metiers_metier_level_pseudo ON METIERS (Metier, Level DESC, Pseudo);",
+        "CREATE INDEX IF NOT EXISTS idx_metiers_pseudo_level ON METIERS (Pseudo, Level);",
+        "CREATE INDEX IF NOT EXISTS idx_lock_zone ON Lock (ZONE);",
+        "CREATE INDEX IF NOT EXISTS idx_lock_pseudo ON Lock (Pseudo);",
+        "ANALYZE;",
+    ]),
+    (3, "lock history archive", [
+        "ALTER TABLE Lock ADD COLUMN Released TEXT;",
+        """
+        CREATE TABLE IF NOT EXISTS LockArchive (
+            ID INTEGER PRIMARY KEY,
+            ZONE TEXT NOT NULL,
+            Pseudo TEXT NOT NULL,
+            Date TEXT,
+            CreatedBy TEXT,
+            Released TEXT
+        );
+        """,
+        # Rows appended by the old reserve/unreserve: only the latest row of a locked zone is still current
         """
-    ]
+        UPDATE Lock SET Released = COALESCE(Date, datetime('now'))
+        WHERE ID NOT IN (
+            SELECT MAX(Lock.ID) FROM Lock JOIN ZONES ON ZONES.ZONE = Lock.ZONE
+            WHERE ZONES.IsLocked = 1 GROUP BY Lock.ZONE
+        );
+        """,
+        "DROP INDEX IF EXISTS idx_lock_zone;",
+        "CREATE INDEX IF NOT EXISTS idx_lock_zone_released ON Lock (ZONE, Released);",
+        "CREATE INDEX IF NOT EXISTS idx_lock_released ON Lock (ID) WHERE Released IS NOT NULL;",
+        "CREATE INDEX IF NOT EXISTS idx_lock_archive_zone ON LockArchive (ZONE);",
+        "CREATE INDEX IF NOT EXISTS idx_lock_archive_pseudo ON LockArchive (Pseudo);",
+        "ANALYZE;",
+    ]),
+    (4, "write-behind journal state", [
+        """
+        CREATE TABLE IF NOT EXISTS WriteBehindState (
+            ID INTEGER PRIMARY KEY CHECK (ID = 1),
+            LastSeq INTEGER NOT NULL
+        );
+        """,
+        "INSERT OR IGNORE INTO WriteBehindState (ID, LastSeq) VALUES (1, 0);",
+    ]),
+    (5, "zone name keys and aliases", [
+        "ALTER TABLE ZONES ADD COLUMN ZoneKey TEXT;",
+        _fill_zone_keys,
+        "CREATE INDEX IF NOT EXISTS idx_zones_key ON ZONES (ZoneKey);",
+        """
+        CREATE TABLE IF NOT EXISTS ZoneAlias (
+            Alias TEXT PRIMARY KEY,
+            ZONE TEXT NOT NULL,
+            CreatedBy TEXT,
+            FOREIGN KEY (ZONE) REFERENCES ZONES (ZONE) ON DELETE CASCADE ON UPDATE CASCADE
+        );
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_zone_alias_zone ON ZoneAlias (ZONE);",
+    ]),
+    # PRAGMA data_version only compares two reads of one connection, this one survives restarts
+    # and also counts the writes made outside the bot
+    (6, "persistent data version", [
+        """
+        CREATE TABLE IF NOT EXISTS DataVersion (
+            ID INTEGER PRIMARY KEY CHECK (ID = 1),
+            Version INTEGER NOT NULL
+        );
+        """,
+        "INSERT OR IGNORE INTO DataVersion (ID, Version) VALUES (1, 0);",
+        "CREATE TRIGGER IF NOT EXISTS data_version_zones_insert AFTER INSERT ON ZONES "
+        "BEGIN UPDATE DataVersion SET Version = Version + 1; END;",
+        "CREATE TRIGGER IF NOT EXISTS data_version_zones_delete AFTER DELETE ON ZONES "
+        "BEGIN UPDATE DataVersion SET Version = Version + 1; END;",
+        "CREATE TRIGGER IF NOT EXISTS data_version_zones_update AFTER UPDATE OF ZONE ON ZONES "
+        "BEGIN UPDATE DataVersion SET Version = Version + 1; END;",
+        "CREATE TRIGGER IF NOT EXISTS data_version_metiers_insert AFTER INSERT ON METIERS "
+        "BEGIN UPDATE DataVersion SET Version = Version + 1; END;",
+        "CREATE TRIGGER IF NOT EXISTS data_version_metiers_delete AFTER DELETE ON METIERS "
+        "BEGIN UPDATE DataVersion SET Version = Version + 1; END;",
+        "CREATE TRIGGER IF NOT EXISTS data_version_metiers_update AFTER UPDATE ON METIERS "
+        "BEGIN UPDATE DataVersion SET Version = Version + 1; END;",
+        "CREATE TRIGGER IF NOT EXISTS data_version_zonealias_insert AFTER INSERT ON ZoneAlias "
+        "BEGIN UPDATE DataVersion SET Version = Version + 1; END;",
+        "CREATE TRIGGER IF NOT EXISTS data_version_zonealias_delete AFTER DELETE ON ZoneAlias "
+        "BEGIN UPDATE DataVersion SET Version = Version + 1; END;",
+        "CREATE TRIGGER IF NOT EXISTS data_version_zonealias_update AFTER UPDATE ON ZoneAlias "
+        "BEGIN UPDATE DataVersion SET Version = Version + 1; END;",
+    ]),
+]
+
+
+def schema_version(connection_obj) -> int:
+    return connection_obj.execute("SELECT COALESCE(MAX(Version), 0) FROM schema_version;").fetchone()[0]
+
+
+def migrate(pool: ConnectionPool):
+    """
+    Apply every migration newer than the recorded schema version of `pool`'s
+    database, each one in its own transaction. A step is a SQL statement or,
+    for data SQLite cannot compute, a function called with the connection.
+    """
+    with pool.connection() as connection_obj:
+        connection_obj.execute(
+            """
+            CREATE TABLE IF NOT EXISTS schema_version (
+                Version INTEGER PRIMARY KEY,
+                Description TEXT,
+                DateApplied TEXT
+            );
+            """
+        )
+        current = schema_version(connection_obj)
+
+        for version, description, statements in MIGRATIONS:
+            if version <= current:
+                continue
+            connection_obj.execute("BEGIN;")
+            for statement in statements:
+                if callable(statement):
+                    statement(connection_obj)
+                else:
+                    connection_obj.execute(statement)
+            connection_obj.execute(
+                "INSERT INTO schema_version (Version, Description, DateApplied) VALUES (?, ?, datetime('now'));",
+                (version, description)
+            )
+            connection_obj.commit()
+            logger.info("Applied migration %s to '%s': %s", version, pool.path, description)
+
+
+def run_init_sql():
+    migrate(get_pool())
+
+
+def analyze():
+    with get_connection() as connection_obj:
+        connection_obj.execute("ANALYZE;")
+        connection_obj.commit()
+
+
+def data_version() -> int:
+    """
+    Counter bumped on every change of the zones, zone aliases and metiers of the current guild.
+    """
+    with get_connection() as connection_obj:
+        return connection_obj.execute("SELECT Version FROM DataVersion;").fetchone()[0]
+
+
+def checkpoint():
+    """
+    Copy the WAL back into the database file and truncate it, so the next start has no log to replay.
+    """
+    with get_connection() as connection_obj:
+        connection_obj.execute("PRAGMA wal_checkpoint(TRUNCATE);")
 
-    for table in tables:
-        cursor_obj.execute(table)
 
-    connection_obj.commit()
-    connection_obj.close()
\ No newline at end of file
+def vacuum():
+    """
+    Rebuild the database file to give back the pages freed by compaction.
+    Takes an exclusive lock for its whole duration.
+    """
+    with get_connection() as connection_obj:
+        connection_obj.execute("VACUUM;")
+        connection_obj.execute("PRAGMA wal_checkpoint(TRUNCATE);")
@@ -0,0 +1,78 @@
+import hashlib
+import json
+import logging
+import time
+from contextlib import contextmanager
+
+from commands.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+TREE_HASH_PATH = '.command_tree.sha256'
+
+
+class StartupTimer:
+    """
+    Wall time of each boot step since `start`, also recorded in the metrics
+    as `startup.<step>` so they show up in the Latency stats.
+    """
+
+    def __init__(self, start: float = None):
+        self.start = time.perf_counter() if start is None else start
+        self.steps = []
+
+    @contextmanager
+    def step(self, name: str):
+        start = time.perf_counter()
+        with metrics.measure(f"startup.{name}"):
+            yield
+        self.steps.append((name, time.perf_counter() - start))
+
+    def report(self, network: tuple = ()) -> str:
+        """
+        One line per step, then the total since `start` without the steps
+        listed in `network` (login, gateway) which depend on Discord, not on us.
+        """
+        total = time.perf_counter() - self.start
+        offline = total - sum(elapsed for name, elapsed in self.steps if name in network)
+        lines = [f"{name:<16} {elapsed * 1000:8.1f} ms" for name, elapsed in self.steps]
+        lines.append(f"{'total':<16} {total * 1000:8.1f} ms ({offline * 1000:.1f} ms excluding {', '.join(network)})")
+        return "\n".join(lines)
+
+
+def _command_payload(command, tree) -> dict:
+    try:
+        return command.to_dict(tree)
+    except TypeError:
+        # discord.py < 2.4 takes no tree argument
+        return command.to_dict()
+
+
+def tree_hash(tree, guild) -> str:
+    """
+    Stable hash of the command payloads Discord would receive for `guild`.
+    """
+    payloads = sorted((_command_payload(command, tree) for command in tree.get_commands(guild=guild)),
+                      key=lambda payload: (payload.get("type", 1), payload["name"]))
+    blob = json.dumps([guild.id, payloads], sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+async def sync_if_changed(tree, guild, path: str = TREE_HASH_PATH) -> bool:
+    """
+    Sync the command tree to `guild` only when its hash differs from the one
+    cached in `path` by the last successful sync. Returns True when synced.
+    """
+    current = tree_hash(tree, guild)
+    try:
+        with open(path) as stream:
+            if stream.read().strip() == current:
+                logger.info("Command tree unchanged, sync skipped")
+                return False
+    except OSError:
+        pass
+    await tree.sync(guild=guild)
+    with open(path, "w") as stream:
+        stream.write(current)
+    logger.info("Command tree synced")
+    return True
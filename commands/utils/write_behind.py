@@ -0,0 +1,286 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import commands.utils.sql as sql
+from commands.utils.percepteur import RESERVED, FREED, CONFLICT, UNKNOWN
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_PATH = 'lbg.journal'
+FLUSH_INTERVAL = 0.05
+FLUSH_MAX_OPS = 256
+# Tries of a group failing on a busy or locked database before it is given up
+FLUSH_RETRIES = 5
+
+
+def _apply(cursor_obj, kind: str, zone_name: str, user: str, date: str):
+    if cursor_obj.execute("SELECT 1 FROM ZONES WHERE ZONE = ?;", (zone_name,)).fetchone() is None:
+        logger.warning("Write-behind %s of deleted zone '%s' skipped.", kind, zone_name)
+        return
+    if kind == "reserve":
+        cursor_obj.execute("UPDATE Lock SET Released = ? WHERE ZONE = ? AND Released IS NULL;", (date, zone_name))
+        cursor_obj.execute("INSERT INTO Lock (ZONE, Pseudo, Date, CreatedBy) VALUES (?, ?, ?, ?);",
+                           (zone_name, user, date, user))
+        cursor_obj.execute("UPDATE ZONES SET IsLocked = 1 WHERE ZONE = ?;", (zone_name,))
+    else:
+        cursor_obj.execute("UPDATE Lock SET Released = ? WHERE ZONE = ? AND Released IS NULL;", (date, zone_name))
+        cursor_obj.execute("UPDATE ZONES SET IsLocked = 0 WHERE ZONE = ?;", (zone_name,))
+
+
+def _commit_group(ops: list) -> int:
+    """
+    Apply `ops` and record the last sequence number in one transaction.
+    An operation breaking a constraint never succeeds on retry, it is logged
+    and dropped alone. Returns the number of dropped operations.
+    """
+    connection_obj = sql.get_pool().acquire()
+    cursor_obj = connection_obj.cursor()
+    dropped = 0
+    try:
+        cursor_obj.execute("BEGIN IMMEDIATE;")
+        for seq, kind, zone_name, user, date in ops:
+            cursor_obj.execute("SAVEPOINT op;")
+            try:
+                _apply(cursor_obj, kind, zone_name, user, date)
+            except sqlite3.IntegrityError as e:
+                cursor_obj.execute("ROLLBACK TO op;")
+                logger.error("Write-behind operation %s dropped: %s", (seq, kind, zone_name, user, date), e)
+                dropped += 1
+            cursor_obj.execute("RELEASE op;")
+        cursor_obj.execute("UPDATE WriteBehindState SET LastSeq = ? WHERE ID = 1;", (ops[-1][0],))
+        connection_obj.commit()
+        return dropped
+    finally:
+        sql.get_pool().release(connection_obj)
+
+
+def _last_applied_seq() -> int:
+    with sql.get_connection() as connection_obj:
+        return connection_obj.execute("SELECT LastSeq FROM WriteBehindState WHERE ID = 1;").fetchone()[0]
+
+
+class WriteBehind:
+    """
+    Optional write-behind mode for the percepteur reservations.
+
+    Reserve, unreserve and free are decided against an in-memory copy of the
+    current holders, appended to a small journal file and acknowledged right away;
+    a single flusher thread then applies them to lbg.db in grouped transactions
+    every `interval` seconds or `max_ops` operations, whichever comes first.
+
+    Durability:
+      * an acknowledged operation has been written and flushed to the journal, so
+        it survives a crash or kill of the bot process; with `fsync=True` it is
+        also fsync'd and survives an OS crash or power loss, at the cost of one
+        fsync per operation;
+      * lbg.db lags the acknowledged state by at most one flush interval;
+      * every operation carries a sequence number and the last applied one is
+        committed with each group (WriteBehindState table), so replaying the
+        journal at startup applies each pending operation exactly once.
+
+    While the mode is on, every Lock/IsLocked mutation and zone deletion must
+    go through it, otherwise the in-memory holders drift from the database. An instance is
+    bound to the guild current when it is created.
+    """
+
+    def __init__(self, journal_path: str = JOURNAL_PATH, interval: float = FLUSH_INTERVAL,
+                 max_ops: int = FLUSH_MAX_OPS, fsync: bool = False):
+        self.journal_path = journal_path
+        self.interval = interval
+        self.max_ops = max_ops
+        self.fsync = fsync
+        self.guild_id = sql.current_guild.get()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._holders = {}
+        self._pending = []
+        self._seq = 0
+        self._journal = None
+        self._thread = None
+        self._stopping = False
+        self.flushed_ops = 0
+        self.flushed_groups = 0
+        self.dropped_ops = 0
+
+    # Lifecycle
+
+    def start(self):
+        self.replay()
+        with sql.get_connection() as connection_obj:
+            rows = connection_obj.execute(
+                "SELECT ZONES.ZONE, Lock.Pseudo FROM ZONES "
+                "LEFT JOIN Lock ON Lock.ZONE = ZONES.ZONE AND Lock.Released IS NULL;"
+            ).fetchall()
+        self._holders = dict(rows)
+        self._seq = _last_applied_seq()
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="lbg-write-behind", daemon=True)
+        self._thread.start()
+        logger.info("Write-behind journal on '%s' (%.0f ms / %s ops groups)",
+                    self.journal_path, self.interval * 1000, self.max_ops)
+
+    def stop(self):
+        """Flush every pending operation, then stop the flusher thread."""
+        with self._lock:
+            self._stopping = True
+            self._wakeup.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    def replay(self):
+        """Apply the journal entries newer than the last committed group."""
+        if not os.path.exists(self.journal_path):
+            return 0
+        last_seq = _last_applied_seq()
+        ops = []
+        with open(self.journal_path, encoding="utf-8") as stream:
+            for line in stream:
+                try:
+                    op = json.loads(line)
+                except ValueError:
+                    # Torn last line of a crash in the middle of an append
+                    break
+                if op[0] > last_seq:
+                    ops.append(tuple(op))
+        if ops:
+            _commit_group(ops)
+            logger.info("Replayed %s journaled reservations", len(ops))
+        open(self.journal_path, "w").close()
+        return len(ops)
+
+    # Operations, called from any thread
+
+    def _known(self, zone_name: str) -> bool:
+        if zone_name in self._holders:
+            return True
+        with sql.get_connection() as connection_obj:
+            row = connection_obj.execute("SELECT 1 FROM ZONES WHERE ZONE = ?;", (zone_name,)).fetchone()
+        if row is not None:
+            self._holders.setdefault(zone_name, None)
+        return row is not None
+
+    def _append(self, kind: str, zone_name: str, user: str):
+        self._seq += 1
+        op = (self._seq, kind, zone_name, user, datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        self._journal.write(json.dumps(op) + "\n")
+        self._journal.flush()
+        if self.fsync:
+            os.fsync(self._journal.fileno())
+        self._pending.append(op)
+        if len(self._pending) >= self.max_ops:
+            self._wakeup.notify()
+
+    def try_reserve(self, zone_name: str, user: str):
+        with self._lock:
+            if not self._known(zone_name):
+                return UNKNOWN, None
+            holder = self._holders[zone_name]
+            if holder is not None:
+                return CONFLICT, holder
+            self._holders[zone_name] = user
+            self._append("reserve", zone_name, user)
+            return RESERVED, user
+
+    def try_unreserve(self, zone_name: str, user: str):
+        with self._lock:
+            if not self._known(zone_name):
+                return UNKNOWN, None
+            holder = self._holders[zone_name]
+            if holder is None:
+                return FREED, None
+            if holder != user:
+                return CONFLICT, holder
+            self._holders[zone_name] = None
+            self._append("unreserve", zone_name, user)
+            return FREED, None
+
+    def delete_zone(self, zone_name: str, delete) -> bool:
+        """
+        Run `delete()`, which deletes the zone from lbg.db, and forget the zone
+        in the same step when it returns True, so no reservation of it is
+        accepted in between.
+        """
+        with self._lock:
+            if not delete():
+                return False
+            self._holders.pop(zone_name, None)
+            return True
+
+    def free(self, zone_name: str, holder: str = None) -> bool:
+        """Free the zone, only if `holder` still holds it when given."""
+        with self._lock:
+            if not self._known(zone_name) or self._holders[zone_name] is None:
+                return False
+            if holder is not None and self._holders[zone_name] != holder:
+                return False
+            self._holders[zone_name] = None
+            self._append("free", zone_name, "")
+            return True
+
+    # Flusher
+
+    def _run(self):
+        sql.current_guild.set(self.guild_id)
+        while True:
+            with self._lock:
+                if not self._stopping and len(self._pending) < self.max_ops:
+                    self._wakeup.wait(self.interval)
+                ops, self._pending = self._pending, []
+                stopping = self._stopping
+            if ops:
+                self._flush(ops)
+            if stopping:
+                with self._lock:
+                    if not self._pending:
+                        self._truncate_journal()
+                        return
+
+    def _flush(self, ops: list):
+        """
+        Commit `ops`, retrying a busy or locked database up to FLUSH_RETRIES
+        times. A group that still fails is logged and given up so the later
+        ones keep flowing.
+        """
+        for attempt in range(1, FLUSH_RETRIES + 1):
+            try:
+                self.dropped_ops += _commit_group(ops)
+            except sqlite3.OperationalError as e:
+                logger.warning("Write-behind flush of %s operations failed (try %s/%s): %s",
+                               len(ops), attempt, FLUSH_RETRIES, e)
+                time.sleep(self.interval * attempt)
+                continue
+            except sqlite3.Error as e:
+                logger.error("Write-behind flush of %s operations failed: %s", len(ops), e)
+                break
+            self.flushed_ops += len(ops)
+            self.flushed_groups += 1
+            with self._lock:
+                if not self._pending:
+                    self._truncate_journal()
+            return
+        self.dropped_ops += len(ops)
+        logger.error("Write-behind operations given up: %s", ops)
+
+    def _truncate_journal(self):
+        if self._journal is not None:
+            self._journal.truncate(0)
+            self._journal.seek(0)
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "flushed_ops": self.flushed_ops,
+            "flushed_groups": self.flushed_groups,
+            "dropped_ops": self.dropped_ops,
+            "ops_per_group": self.flushed_ops / self.flushed_groups if self.flushed_groups else 0.0,
+        }
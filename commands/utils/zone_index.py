@@ -0,0 +1,281 @@
+import bisect
+import heapq
+import logging
+import threading
+import unicodedata
+from collections import Counter
+
+import commands.utils.sql as sql
+
+logger = logging.getLogger(__name__)
+
+MAX_CHOICES = 25
+MAX_SUGGESTIONS = 3
+COMMON_GRAM_SHARE = 0.25
+GRAM = 3
+
+
+def normalize(text: str) -> str:
+    """Casefold and strip accents so "plaine des porkass" finds "Plaine des Porkass"."""
+    decomposed = unicodedata.normalize('NFKD', text.casefold())
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).strip()
+
+
+def max_edits(key: str) -> int:
+    """Typos tolerated in a name of this length."""
+    return 1 if len(key) <= 5 else 2 if len(key) <= 12 else 3
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """
+    Levenshtein distance between `a` and `b`, or `limit + 1` as soon as it is
+    known to be larger than `limit`. Only the cells within `limit` of the
+    diagonal are computed.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if len(a) > len(b):
+        a, b = b, a
+    over = limit + 1
+    previous = list(range(len(a) + 1))
+    for i, char_b in enumerate(b, 1):
+        low, high = max(1, i - limit), min(len(a), i + limit)
+        current = [over] * (len(a) + 1)
+        current[0] = i
+        left = current[low - 1]
+        row_min = left
+        for j in range(low, high + 1):
+            # Plain comparisons, min() is the bottleneck of this loop
+            cost = previous[j - 1] + (a[j - 1] != char_b)
+            if previous[j] + 1 < cost:
+                cost = previous[j] + 1
+            if left + 1 < cost:
+                cost = left + 1
+            current[j] = left = cost
+            if cost < row_min:
+                row_min = cost
+        if row_min > limit:
+            return over
+        previous = current
+    return min(previous[-1], over)
+
+
+def _grams(key: str):
+    return {key[i:i + GRAM] for i in range(len(key) - GRAM + 1)}
+
+
+def _word_suffixes(key: str):
+    return [key[i + 1:] for i, c in enumerate(key) if c in " -'" and key[i + 1:i + 2].isalnum()]
+
+
+def _remove_sorted(items: list, item):
+    position = bisect.bisect_left(items, item)
+    if position < len(items) and items[position] == item:
+        del items[position]
+
+
+class ZoneIndex:
+    """
+    In-memory search index over the ZONES names used by the zone autocomplete.
+
+    Matches are ranked whole-name prefix first, then word prefix ("porkass"
+    in "Plaine des Porkass"), then any substring. The first two come from
+    sorted lists walked with bisect, the last from a trigram posting list, and
+    every stage stops as soon as enough choices are found so a keystroke never
+    touches sqlite nor scans every zone.
+
+    `resolve` maps a name typed with any case or accents, or one of its
+    aliases, to the stored name, and `suggest` offers the closest names
+    within a few typos when it does not.
+    """
+
+    def __init__(self, label: str = 'zones'):
+        self.label = label
+        self._lock = threading.Lock()
+        self._names = {}
+        self._keys = []
+        self._words = []
+        self._grams = {}
+        self._aliases = {}
+        self.loaded = False
+
+    def load(self, names=None, aliases=None):
+        """
+        Index `names`, and `aliases` as (alias, name) pairs, read from ZONES and ZoneAlias by default.
+        """
+        if names is None:
+            with sql.get_connection() as connection_obj:
+                names = [row[0] for row in connection_obj.execute("SELECT ZONE FROM ZONES;")]
+                aliases = connection_obj.execute("SELECT Alias, ZONE FROM ZoneAlias;").fetchall()
+        with self._lock:
+            self._names = {}
+            self._keys = []
+            self._words = []
+            self._grams = {}
+            for name in names:
+                self._add(name)
+            self._keys.sort()
+            self._words.sort()
+            self._aliases = {normalize(alias): normalize(name) for alias, name in aliases or ()}
+            self.loaded = True
+        logger.info("Index loaded with %s %s", len(self._names), self.label)
+
+    def _add(self, name: str, keep_sorted: bool = False):
+        key = normalize(name)
+        if key in self._names:
+            return
+        self._names[key] = name
+        insert = bisect.insort if keep_sorted else list.append
+        insert(self._keys, key)
+        for suffix in _word_suffixes(key):
+            insert(self._words, (suffix, key))
+        for gram in _grams(key):
+            self._grams.setdefault(gram, set()).add(key)
+
+    def dump(self) -> dict:
+        """
+        The built index tables, for `restore` to skip normalizing and indexing every name again.
+        """
+        with self._lock:
+            return {"names": self._names, "keys": self._keys, "words": self._words, "grams": self._grams,
+                    "aliases": self._aliases}
+
+    def restore(self, tables: dict):
+        with self._lock:
+            self._names = tables["names"]
+            self._keys = tables["keys"]
+            self._words = tables["words"]
+            self._grams = tables["grams"]
+            self._aliases = tables["aliases"]
+            self.loaded = True
+        logger.info("Index restored with %s %s", len(self._names), self.label)
+
+    def add(self, *names: str):
+        with self._lock:
+            for name in names:
+                self._add(name, keep_sorted=True)
+
+    def add_alias(self, alias: str, name: str):
+        with self._lock:
+            self._aliases[normalize(alias)] = normalize(name)
+
+    def remove(self, name: str):
+        key = normalize(name)
+        with self._lock:
+            if self._names.pop(key, None) is None:
+                return
+            if key in self._aliases.values():
+                self._aliases = {alias: target for alias, target in self._aliases.items() if target != key}
+            _remove_sorted(self._keys, key)
+            for suffix in _word_suffixes(key):
+                _remove_sorted(self._words, (suffix, key))
+            for gram in _grams(key):
+                keys = self._grams.get(gram)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._grams[gram]
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, name: str):
+        return normalize(name) in self._names
+
+    def resolve(self, current: str):
+        """
+        Stored name of `current` typed with any case or accents, or as an alias, None when unknown.
+        """
+        if not self.loaded:
+            self.load()
+        key = normalize(current)
+        return self._names.get(self._aliases.get(key, key))
+
+    def suggest(self, current: str, limit: int = MAX_SUGGESTIONS):
+        """
+        Up to `limit` names closest to `current` within max_edits typos, closest first.
+
+        One edit changes at most GRAM trigrams, so a name within `bound` edits
+        shares at least len(query trigrams) - GRAM * bound of them. Names are
+        checked most shared trigrams first and the bound tightens as closer
+        suggestions are found, so the scan stops after a handful of names.
+        """
+        if not self.loaded:
+            self.load()
+        query = normalize(current)
+        bound = max_edits(query)
+        grams = _grams(query)
+        with self._lock:
+            # Trigrams found in most names rule out almost nothing, leave them out of the count
+            common = {gram for gram in grams if len(self._grams.get(gram, ())) > len(self._names) * COMMON_GRAM_SHARE}
+            grams -= common
+            if len(grams) > GRAM * bound:
+                shared = Counter()
+                for gram in grams:
+                    shared.update(self._grams.get(gram, ()))
+                candidates = shared.most_common()
+            else:
+                # Too short for the trigrams to rule anything out
+                candidates = [(key, len(grams)) for key in self._names]
+            # Max-heap of the `limit` closest so far, as (-distance, key)
+            best = []
+            for key, count in candidates:
+                if count < len(grams) - GRAM * bound:
+                    break
+                distance = edit_distance(query, key, bound)
+                if distance > bound:
+                    continue
+                if len(best) < limit:
+                    heapq.heappush(best, (-distance, key))
+                else:
+                    heapq.heapreplace(best, (-distance, key))
+                if len(best) == limit:
+                    # Only strictly closer names can still get in
+                    bound = -best[0][0] - 1
+                    if bound < 0:
+                        break
+            return [self._names[key] for _, key in sorted(best, key=lambda item: (-item[0], item[1]))]
+
+    def _prefix_matches(self, query: str, found: dict, limit: int):
+        position = bisect.bisect_left(self._keys, query)
+        while len(found) < limit and position < len(self._keys) and self._keys[position].startswith(query):
+            found.setdefault(self._keys[position])
+            position += 1
+
+    def _word_matches(self, query: str, found: dict, limit: int):
+        position = bisect.bisect_left(self._words, (query,))
+        while len(found) < limit and position < len(self._words) and self._words[position][0].startswith(query):
+            found.setdefault(self._words[position][1])
+            position += 1
+
+    def _substring_matches(self, query: str, found: dict, limit: int):
+        if len(query) < GRAM:
+            candidates = self._keys
+        else:
+            postings = [self._grams.get(gram) for gram in _grams(query)]
+            if not all(postings):
+                return
+            candidates = min(postings, key=len)
+        for key in candidates:
+            if len(found) >= limit:
+                return
+            if query in key:
+                found.setdefault(key)
+
+    def search(self, current: str, limit: int = MAX_CHOICES):
+        """
+        Return up to `limit` zone names matching `current`, case and accent insensitive.
+        """
+        if not self.loaded:
+            self.load()
+        query = normalize(current)
+        found = {}
+        with self._lock:
+            for stage in (self._prefix_matches, self._word_matches, self._substring_matches):
+                stage(query, found, limit)
+                if len(found) >= limit:
+                    break
+            return [self._names[key] for key in found]
+
+
+zones = ZoneIndex()
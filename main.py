@@ -1,30 +1,148 @@
+import asyncio
+import time
+
+_boot = time.perf_counter()
+
 import discord
 import logging
 from discord import app_commands
 
-from commands.utils.config import load_config
-from commands.help import helper_wrapper
-from commands.percepteur import percepteur_wrapper
-from commands.metier import metier_wrapper
-from commands.admin import admin_wrapper
-from commands.utils.sql import run_init_sql
+from commands.utils.config import load_config, config
+from commands.utils.startup import StartupTimer, sync_if_changed, TREE_HASH_PATH
+
+startup = StartupTimer(_boot)
 
-run_init_sql()
+with startup.step("imports"):
+    from commands.help import helper_wrapper
+    from commands.percepteur import percepteur_wrapper
+    from commands.metier import metier_wrapper
+    from commands.admin import admin_wrapper
+    from commands.utils import async_db
+    from commands.utils import metrics
+    from commands.utils import events
+    from commands.utils import log
+    from commands.utils import lifecycle
+    from commands.utils import snapshot
+    import commands.utils.sql as sql
+    import commands.utils.percepteur as percepteur
+    from commands.utils.expiry import scheduler as expiry, RESERVATION_TTL
 
-cfg = load_config()
-MY_GUILD = discord.Object(id=cfg["guild"])
+with startup.step("config"):
+    cfg = load_config()
+    log.setup(cfg)
+    config.on_reload(log.apply_levels)
+    MY_GUILD = discord.Object(id=cfg["guild"])
+    # The first guild keeps lbg.db, every other one gets its own lbg-<id>.db
+    GUILDS = [MY_GUILD] + [discord.Object(id=guild_id) for guild_id in cfg.get("guilds", [])
+                           if guild_id != cfg["guild"]]
+    sql.set_primary_guild(MY_GUILD.id)
+    snapshot.path = cfg.get("snapshot_file", snapshot.SNAPSHOT_PATH)
+    async_db.configure(cfg.get("db_readers", async_db.DEFAULT_READERS))
 
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
 discord_logger = logging.getLogger("discord")
 
-class MyClient(discord.Client):
+
+def init_db():
+    """
+    DB-dependent boot work of the current guild, run on its writer thread once logged in.
+    """
+    from commands.utils import guilds
+
+    with startup.step("migrations"):
+        sql.run_init_sql()
+    with startup.step("guild state"):
+        state = guilds.state()
+
+    if cfg.get("write_behind"):
+        from commands.utils.write_behind import WriteBehind, JOURNAL_PATH, FLUSH_INTERVAL, FLUSH_MAX_OPS
+        with startup.step("write-behind"):
+            state.write_behind = WriteBehind(
+                sql.partition_path(cfg.get("write_behind_journal", JOURNAL_PATH)),
+                cfg.get("write_behind_interval_ms", FLUSH_INTERVAL * 1000) / 1000,
+                cfg.get("write_behind_max_ops", FLUSH_MAX_OPS),
+                cfg.get("write_behind_fsync", False),
+            )
+            state.write_behind.start()
+
+
+class GuildCommandTree(app_commands.CommandTree):
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        # Runs in the task of the command or autocomplete callback, which then works on this guild's data
+        sql.current_guild.set(interaction.guild_id)
+        return True
+
+
+# One shard is enough below ~2500 guilds, AutoShardedClient asks Discord for the count otherwise
+_Client = discord.AutoShardedClient if cfg.get("sharded") else discord.Client
+
+
+class MyClient(_Client):
     def __init__(self, *, intents: discord.Intents):
-        super().__init__(intents=intents)
-        self.tree = app_commands.CommandTree(self)
+        if cfg.get("sharded"):
+            super().__init__(intents=intents, shard_count=cfg.get("shard_count"))
+        else:
+            super().__init__(intents=intents)
+        self.tree = GuildCommandTree(self)
+        self._login_started = None
+        self._gateway_started = None
+        self._tasks = []
+        self._shut_down = False
+
+    def background(self, coroutine):
+        """Run `coroutine` as a task cancelled on shutdown."""
+        self._tasks.append(self.loop.create_task(coroutine))
+
+    async def login(self, token: str):
+        self._login_started = time.perf_counter()
+        await super().login(token)
 
     async def setup_hook(self):
-        self.tree.copy_global_to(guild=MY_GUILD)
-        await self.tree.sync(guild=MY_GUILD)
+        # Interactions only arrive once the gateway is up, after this hook returns
+        startup.steps.append(("login", time.perf_counter() - self._login_started))
+        lifecycle.install_signal_handlers(self.loop, self.close)
+        if cfg.get("event_log_dir"):
+            events.start(cfg["event_log_dir"])
+        for guild in GUILDS:
+            with sql.use_guild(guild.id):
+                await async_db.run_write(init_db)
+
+        from commands.utils import maintenance
+        self.background(maintenance.maintenance_loop())
+        ttl_hours = cfg.get("reservation_ttl_hours", RESERVATION_TTL / 3600)
+        if ttl_hours:
+            expiry.ttl = ttl_hours * 3600
+            expiry.notify = self.notify_expired
+            self.background(expiry.run([guild.id for guild in GUILDS]))
+        self.background(config.watch_forever())
+        if cfg.get("metrics_file"):
+            self.background(metrics.dump_forever(cfg["metrics_file"]))
+
+        hash_path = cfg.get("command_tree_hash_file", TREE_HASH_PATH)
+        with startup.step("tree sync"):
+            for guild in GUILDS:
+                self.tree.copy_global_to(guild=guild)
+                await sync_if_changed(self.tree, guild, sql.partition_path(hash_path, guild.id))
+        self._gateway_started = time.perf_counter()
+
+    async def close(self):
+        # Also reached from client.run on Ctrl+C, persist only once
+        await super().close()
+        if self._shut_down:
+            return
+        self._shut_down = True
+        # Gateway closed: no new interaction, the ones running finish through the executors
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await asyncio.to_thread(lifecycle.shutdown)
+
+    async def notify_expired(self, guild_key, freed: list):
+        channel_id = load_config().get("expiry_channels", {}).get(guild_key or MY_GUILD.id)
+        channel = self.get_channel(channel_id) if channel_id else None
+        if channel is not None:
+            await channel.send(embed=percepteur.render_expired(freed))
+
 
 _intents = discord.Intents.default()
 _intents.guilds = True
@@ -32,16 +150,35 @@ client = MyClient(intents=_intents)
 
 @client.event
 async def on_ready():
-    logging.info(f"{client.user} is connected to the following guilds:")
+    logger.info("%s is connected to the following guilds:", client.user)
     for guild in client.guilds:
-        logging.info(f"{guild.name} (id: {guild.id})")
-    logging.info("Permission listing complete.")
+        logger.info("%s (id: %s)", guild.name, guild.id)
+    logger.info("Permission listing complete.")
+    # on_ready fires again after every reconnect, report the boot only once
+    if client._gateway_started is not None:
+        startup.steps.append(("gateway", time.perf_counter() - client._gateway_started))
+        client._gateway_started = None
+        logger.info("Startup timing:\n%s", startup.report(network=("login", "tree sync", "gateway")))
+        start_live_boards()
+
+
+def start_live_boards():
+    from commands.utils.occupancy import LiveBoard
+
+    for guild_id, channel_id in cfg.get("live_board_channels", {}).items():
+        channel = client.get_channel(channel_id)
+        if channel is None:
+            logger.warning("Live board channel %s of guild %s not found", channel_id, guild_id)
+            continue
+        client.background(LiveBoard(channel, guild_id).run())
 
 # Register commands
-helper_wrapper(client)
-percepteur_wrapper(client)
-metier_wrapper(client)
-admin_wrapper(client)
+with startup.step("register"):
+    helper_wrapper(client)
+    percepteur_wrapper(client)
+    metier_wrapper(client)
+    admin_wrapper(client)
 
 # Run the bot
-client.run(cfg["token"])
+# discord.py logs through the root queue handler set up by log.setup
+client.run(cfg["token"], log_handler=None)